@@ -0,0 +1,150 @@
+import asyncio
+import base64
+import time
+from collections import deque
+
+from tqdm import tqdm
+
+from prompt_grid import SYSTEM_PROMPT, cell_path, extract_python_code, save_code
+from run_manifest import prompt_hash
+
+
+def encode_image(image_path):
+    with open(image_path, "rb") as image_file:
+        return base64.b64encode(image_file.read()).decode('utf-8')
+
+
+class Endpoint:
+    """An AsyncOpenAI client together with its concurrency and tokens-per-minute budget.
+
+    Every model served by the same base_url/key should share one Endpoint so the
+    limits apply to the provider as a whole.
+    """
+
+    def __init__(self, client, max_concurrency=8, tokens_per_minute=None, completion_token_estimate=4096):
+        self.client = client
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.tokens_per_minute = tokens_per_minute
+        self.completion_token_estimate = completion_token_estimate
+        self._window = deque()  # [timestamp, tokens] of requests sent in the last minute
+        self._lock = asyncio.Lock()
+
+    async def reserve(self, tokens):
+        """Waits until `tokens` fit into the rolling one-minute budget and books them."""
+        if self.tokens_per_minute is None:
+            return None
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._window and now - self._window[0][0] >= 60:
+                    self._window.popleft()
+                used = sum(entry[1] for entry in self._window)
+                if not self._window or used + tokens <= self.tokens_per_minute:
+                    entry = [now, tokens]
+                    self._window.append(entry)
+                    return entry
+                await asyncio.sleep(60 - (now - self._window[0][0]))
+
+    def settle(self, entry, tokens):
+        """Replaces the estimate booked by `reserve` with the usage the API reported."""
+        if entry is not None and tokens:
+            entry[1] = tokens
+
+
+def build_messages(system_prompt, prompt, base64_image=None):
+    if base64_image is None:
+        user_content = prompt
+    else:
+        user_content = [
+            {"type": "text", "text": prompt},
+            {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{base64_image}"}},
+        ]
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_content},
+    ]
+
+
+async def request_completion(endpoint, model_name, messages, max_tokens=32768, retries=3):
+    """Sends one chat completion under the endpoint's limits, retrying with backoff."""
+    prompt_chars = sum(len(m["content"]) if isinstance(m["content"], str) else len(m["content"][0]["text"]) for m in messages)
+    estimate = prompt_chars // 4 + min(max_tokens, endpoint.completion_token_estimate)
+    for attempt in range(retries + 1):
+        async with endpoint.semaphore:
+            entry = await endpoint.reserve(estimate)
+            try:
+                response = await endpoint.client.chat.completions.create(
+                    model=model_name,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                )
+            except Exception:
+                if attempt == retries:
+                    raise
+                response = None
+        if response is None:
+            # back off without holding a concurrency slot
+            await asyncio.sleep(2 ** attempt)
+            continue
+        if response.usage is not None:
+            endpoint.settle(entry, response.usage.total_tokens)
+        return response.choices[0].message.content
+
+
+async def generate_cell(endpoint, model_name, name_tail, cell, system_prompt=SYSTEM_PROMPT, base64_image=None, max_tokens=32768, manifest=None, cache=None):
+    file_path = cell_path(name_tail, cell)
+    messages = build_messages(system_prompt, cell.prompt, base64_image)
+    cell_hash = prompt_hash(system_prompt, cell.prompt, base64_image)
+    try:
+        content = None
+        if cache is not None:
+            cache_key = cache.make_key(model_name, system_prompt, cell.prompt, base64_image, max_tokens, cell.sample)
+            content = cache.get(cache_key)
+        if content is None:
+            content = await request_completion(endpoint, model_name, messages, max_tokens)
+            if cache is not None and content:
+                cache.put(cache_key, content, model=model_name)
+        code = extract_python_code(content or "")
+        if not code:
+            raise ValueError("empty response")
+    except Exception as e:
+        print(f"❌ {model_name} failed on '{file_path}': {e}")
+        if manifest is not None:
+            manifest.record(model_name, cell_hash, cell.sample, file_path, False, error=str(e))
+        return file_path, False
+    # written as soon as this response arrives, independent of the rest of the grid
+    ok = save_code(file_path, code)
+    if manifest is not None:
+        manifest.record(model_name, cell_hash, cell.sample, file_path, ok, error=None if ok else "write failed")
+    return file_path, ok
+
+
+async def generate_grid(models, cells, system_prompt=SYSTEM_PROMPT, base64_image=None, max_tokens=32768, manifest=None, cache=None):
+    """Fans out every (model, cell) pair at once.
+
+    `models` is a list of (model_name, name_tail, endpoint). Concurrency is bounded
+    per endpoint, so many models behind different providers run side by side.
+    Cells already completed in `manifest` (a RunManifest) are skipped, and
+    responses found in `cache` (a ResponseCache) are written without an API call.
+    Returns a list of (file_path, ok) for the cells that were requested.
+    """
+    pending = []
+    for model_name, name_tail, endpoint in models:
+        for cell in cells:
+            if manifest is not None and manifest.is_done(model_name, prompt_hash(system_prompt, cell.prompt, base64_image), cell.sample):
+                continue
+            pending.append((model_name, name_tail, endpoint, cell))
+    skipped = len(models) * len(cells) - len(pending)
+    if skipped:
+        print(f"Skipping {skipped} cells already completed in '{manifest.path}'.")
+
+    tasks = [
+        asyncio.ensure_future(generate_cell(endpoint, model_name, name_tail, cell, system_prompt, base64_image, max_tokens, manifest, cache))
+        for model_name, name_tail, endpoint, cell in pending
+    ]
+    results = []
+    for task in tqdm(asyncio.as_completed(tasks), total=len(tasks)):
+        results.append(await task)
+    failed = sum(1 for _, ok in results if not ok)
+    print(f"Finished {len(results) - failed}/{len(results)} cells ({failed} failed).")
+    return results
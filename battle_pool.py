@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class BattlePool:
+    """Battles for the standard reference prompts, generated ahead of time.
+
+    Worker threads keep up to `quota` ready battles per prompt (an int, or a dict
+    of per-prompt quotas) and at most `capacity` in total, always topping up the
+    emptiest prompt first. They only work while no user request is in flight
+    (see `foreground`), so pre-generation never competes with a live battle.
+    Battles older than `max_age` seconds are evicted, so the served model
+    pairs do not go stale.
+
+    `generate(prompt)` must return a battle dict, or None if it failed. It
+    should not answer from a response cache, or a refill after eviction serves
+    the same answers again.
+    """
+
+    def __init__(self, prompts, generate, quota=1, capacity=256, max_age=3600, workers=2):
+        self.prompts = list(prompts)
+        self.generate = generate
+        self.quotas = quota if isinstance(quota, dict) else {prompt: quota for prompt in self.prompts}
+        self.capacity = capacity
+        self.max_age = max_age
+        # keyed by the stripped prompt, as text boxes may drop the trailing newline
+        self._ready = {prompt.strip(): deque() for prompt in self.prompts}
+        self._in_progress = {prompt: 0 for prompt in self.prompts}
+        self._foreground = 0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def _evict(self, now):
+        for battles in self._ready.values():
+            while battles and now - battles[0]['created'] > self.max_age:
+                battles.popleft()
+
+    def __len__(self):
+        with self._cond:
+            self._evict(time.time())
+            return sum(len(battles) for battles in self._ready.values())
+
+    def _next_prompt(self):
+        """The prompt furthest below its quota, or None if every quota (or the capacity) is met."""
+        total = sum(len(b) for b in self._ready.values()) + sum(self._in_progress.values())
+        if total >= self.capacity:
+            return None
+        best, best_fill = None, 1.0
+        for prompt in self.prompts:
+            quota = self.quotas.get(prompt, 0)
+            if quota <= 0:
+                continue
+            fill = (len(self._ready[prompt.strip()]) + self._in_progress[prompt]) / quota
+            if fill < best_fill:
+                best, best_fill = prompt, fill
+        return best
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopped:
+                        return
+                    self._evict(time.time())
+                    prompt = None if self._foreground else self._next_prompt()
+                    if prompt is not None:
+                        break
+                    # woken by take()/foreground exit; the timeout also re-checks ages
+                    self._cond.wait(timeout=min(self.max_age, 60))
+                self._in_progress[prompt] += 1
+            try:
+                battle = self.generate(prompt)
+            except Exception as e:
+                print(f"Pre-generating a battle failed: {e}")
+                battle = None
+            with self._cond:
+                self._in_progress[prompt] -= 1
+                if battle is not None:
+                    battle['created'] = time.time()
+                    self._ready[prompt.strip()].append(battle)
+                else:
+                    # back off instead of hammering a failing endpoint
+                    self._cond.wait(timeout=5)
+
+    def take(self, prompt):
+        """A ready battle for this prompt (oldest first), or None."""
+        with self._cond:
+            battles = self._ready.get(prompt.strip())
+            if not battles:
+                return None
+            self._evict(time.time())
+            battle = battles.popleft() if battles else None
+            self._cond.notify_all()
+            return battle
+
+    @contextmanager
+    def foreground(self):
+        """Marks a live user request; background generation pauses until it ends."""
+        with self._cond:
+            self._foreground += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._foreground -= 1
+                self._cond.notify_all()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
@@ -1,15 +1,28 @@
 import gradio as gr
+import numpy as np
 import base64
 import re
 import os
 from openai import OpenAI
 import random
 import traceback
-import subprocess
-import csv
-from datetime import datetime
+import shutil
+import tempfile
 import uuid
 import argparse
+import queue
+import threading
+import time
+
+from battle_pool import BattlePool
+from matchmaking import Matchmaker
+from model_registry import ModelRegistry
+from pointlight_player import PointLightPlayer, encode_trajectory
+from preference_store import PreferenceStore
+from prompt_grid import SYSTEM_PROMPT
+from response_cache import ResponseCache
+from sandbox_pool import SandboxPool
+from vote_store import PREFERENCE_WINNERS
 
 
 
@@ -29,85 +42,190 @@ def extract_python_code(content):
     if match: return match.group(1).strip()
     return content.strip()
 
-def call_model_api(client, model_name, prompt, base64_image):
+def build_messages(prompt, base64_image):
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+    ]
+    user_content = [{"type": "text", "text": prompt}]
+    if base64_image:
+        user_content.append({"type": "image_url", "image_url": {"url": f"data:image/png;base64,{base64_image}"}})
+    messages.append({"role": "user", "content": user_content})
+    return messages
+
+def call_model_api(client, model_name, prompt, base64_image, fresh=False):
+    start = time.monotonic()
     try:
-        messages = [
-            {"role": "system", "content": "You are an expert Python programmer. You will be given a question (problem specification) and will generate a correct Python program that matches the specification. \
-                You will NOT return anything except for the program."},
-        ]
-        user_content = [{"type": "text", "text": prompt}]
-        if base64_image:
-            user_content.append({"type": "image_url", "image_url": {"url": f"data:image/png;base64,{base64_image}"}})
-        messages.append({"role": "user", "content": user_content})
+        # identical requests are answered from the response cache; with several
+        # sample slots a random one is picked so repeats still vary. A fresh call
+        # skips the lookup but still stores its answer.
+        sample = random.randrange(CACHE_SAMPLE_SLOTS)
+        cache_key = RESPONSE_CACHE.make_key(model_name, SYSTEM_PROMPT, prompt, base64_image, 32768, sample)
+        content = None if fresh else RESPONSE_CACHE.get(cache_key)
+        if content is not None:
+            return extract_python_code(content)
 
         response = client.chat.completions.create(
             model=model_name,
-            messages=messages,
+            messages=build_messages(prompt, base64_image),
             max_tokens=32768,
+            timeout=MODEL_REGISTRY.timeout(model_name),
         )
         content = response.choices[0].message.content
-        return extract_python_code(content)
+        code = extract_python_code(content or "")
+        if not code:
+            raise ValueError("empty completion")
+        MODEL_REGISTRY.record(model_name, time.monotonic() - start, True, started=start)
+        RESPONSE_CACHE.put(cache_key, content, model=model_name)
+        return code
     except Exception as e:
-        error_message = f"--- ERROR ---\nModel: {model_name}\n{traceback.format_exc()}"
-        print(error_message)
-        return error_message
+        return _model_failed(model_name, e, start)
+
+def stream_model_api(client, model_name, prompt, base64_image):
+    """Like call_model_api, but yields the response text accumulated so far as tokens arrive.
+
+    The last value yielded is the extracted code (or the error message).
+    """
+    start = time.monotonic()
+    try:
+        sample = random.randrange(CACHE_SAMPLE_SLOTS)
+        cache_key = RESPONSE_CACHE.make_key(model_name, SYSTEM_PROMPT, prompt, base64_image, 32768, sample)
+        content = RESPONSE_CACHE.get(cache_key)
+        if content is not None:
+            yield extract_python_code(content)
+            return
+
+        # the client timeout bounds each wait for data; the whole response gets the same budget
+        timeout = MODEL_REGISTRY.timeout(model_name)
+        stream = client.chat.completions.create(
+            model=model_name,
+            messages=build_messages(prompt, base64_image),
+            max_tokens=32768,
+            stream=True,
+            timeout=timeout,
+        )
+        content = ""
+        for chunk in stream:
+            if time.monotonic() - start > timeout:
+                stream.close()
+                raise TimeoutError(f"no complete response within {timeout}s")
+            if chunk.choices and chunk.choices[0].delta.content:
+                content += chunk.choices[0].delta.content
+                yield content
+        code = extract_python_code(content)
+        if not code:
+            raise ValueError("empty completion")
+        MODEL_REGISTRY.record(model_name, time.monotonic() - start, True, started=start)
+        RESPONSE_CACHE.put(cache_key, content, model=model_name)
+        yield code
+    except Exception as e:
+        yield _model_failed(model_name, e, start)
+
+def _model_failed(model_name, error, started=None):
+    # the traceback goes to the server log; voters only see that the model failed
+    print(f"--- ERROR ---\nModel: {model_name}\n{traceback.format_exc()}")
+    MODEL_REGISTRY.record(model_name, None, False, started=started)
+    return f"--- ERROR ---\nThe model did not return a response ({type(error).__name__}). Please generate a new battle."
+
+def probe_model(model_name):
+    # smallest request that shows the model is answering again; raises if not
+    client_for(model_name).chat.completions.create(
+        model=model_name,
+        messages=[{"role": "user", "content": "Reply with OK."}],
+        max_tokens=16,
+        timeout=MODEL_REGISTRY.timeout(model_name),
+    )
+
+def _pump_stream(side, stream, updates):
+    # runs in a worker thread; the last item per side is (side, text, True)
+    text = ""
+    for text in stream:
+        updates.put((side, text, False))
+    updates.put((side, text, True))
 
 def run_generated_code(code):
+    """Runs the script headless; returns (player update, video update, run log).
 
+    In points playback only the point-light trajectory is captured and played
+    on a canvas in the browser, framed by the script's own axis limits. A clip
+    is rendered in a second run only for scripts that animate but have nothing
+    to trace.
+    """
     if not code:
-        return "No code to run."
+        return None, None, "No code to run."
     
-    script_filename = f"temp_script_{uuid.uuid4()}.py"
+    clip_id = uuid.uuid4().hex
+    capture = {'frames': int(CLIP_SECONDS * CLIP_FPS), 'fps': CLIP_FPS}
     try:
-        with open(script_filename, "w", encoding="utf-8") as f:
-            f.write(code)
-        
-        # Execute the script and capture its output
-        result = subprocess.run(
-            ["python", script_filename], 
-            capture_output=True, 
-            text=True, 
-            timeout=60  
-        )
+        # Execute the script in a pre-warmed sandbox worker; clip frames are piped
+        # into the encoder as they are drawn, so the clip is done when the script is
+        payload, video, result = None, None, None
+        if PLAYBACK == "points":
+            trace_path = os.path.join(CLIP_DIR, f"{clip_id}.npz")
+            result = SANDBOX_POOL.run(code, capture=dict(capture, trace=trace_path))
+            if os.path.exists(trace_path):
+                with np.load(trace_path) as data:
+                    payload = encode_trajectory(data['points'], str(data['coords']), CLIP_FPS, data['limits'])
+                os.remove(trace_path)
+        if payload is None and (result is None or (result['returncode'] == 0 and result['frames'] and not result['timed_out'])):
+            video_path = os.path.join(CLIP_DIR, f"{clip_id}.{CLIP_FORMAT}")
+            result = SANDBOX_POOL.run(code, capture=dict(capture, video=video_path))
+            video = video_path if os.path.exists(video_path) else None
+            _prune_clips()
+        player_update = gr.update(value=payload, visible=payload is not None)
+        video_update = gr.update(value=video, visible=payload is None)
+
+        if result['timed_out']:
+            return player_update, video_update, f"❌ Script execution timed out after {SANDBOX_POOL.timeout} seconds."
         
         # Format the log output
-        output_log = f"--- STDOUT ---\n{result.stdout.strip()}\n\n--- STDERR ---\n{result.stderr.strip()}"
+        output_log = f"--- STDOUT ---\n{result['stdout'].strip()}\n\n--- STDERR ---\n{result['stderr'].strip()}"
 
-        if result.returncode == 0:
-            return f"✅ Script executed successfully.\n\n{output_log}"
+        if result['returncode'] == 0 and not result['frames']:
+            return player_update, video_update, f"ℹ️ The script ran without drawing an animation, so there is nothing to play.\n\n{output_log}"
+        if result['returncode'] == 0:
+            return player_update, video_update, f"✅ Script executed successfully.\n\n{output_log}"
         else:
-            return f"❌ Script exited with error code {result.returncode}.\n\n{output_log}"
+            return player_update, video_update, f"❌ Script exited with error code {result['returncode']}.\n\n{output_log}"
 
-    except subprocess.TimeoutExpired:
-        return "❌ Script execution timed out after 60 seconds."
     except Exception as e:
-        return f"❌ An unexpected error occurred: {e}"
-    finally:
-        # Clean up the temporary script file
-        if os.path.exists(script_filename):
-            os.remove(script_filename)
-
-def get_next_battle_id():
-    if not os.path.exists(PREFERENCES_FILE): return 1
-    try:
-        with open(PREFERENCES_FILE, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-            if len(lines) < 2: return 1
-            last_id = int(lines[-1].split(',')[0])
-            return last_id + 1
-    except:
-        return 1
+        return None, None, f"❌ An unexpected error occurred: {e}"
+
+def _prune_clips():
+    # Gradio serves a returned clip from its own cache copy; ours only have to
+    # outlive the pooled battles that still point at them
+    clips = sorted((entry.stat().st_mtime, entry.path) for entry in os.scandir(CLIP_DIR)
+                   if entry.is_file() and not entry.name.endswith('.npz'))
+    for _, path in clips[:-CLIP_KEEP]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def client_for(model_name):
+    return client_special if MODEL_REGISTRY.endpoint(model_name) == "special" else client
+
+def pregenerate_battle(prompt):
+    # runs in a BattlePool worker with the default example image; failed calls are not pooled.
+    # Answers are fetched fresh, so a refill after eviction does not serve the same cached code.
+    available = MODEL_REGISTRY.available()
+    if len(available) < 2:
+        return None
+    model_a_name, model_b_name = MATCHMAKER.choose_pair(available)
+    code_a = call_model_api(client_for(model_a_name), model_a_name, prompt, REFERENCE_IMAGE, fresh=True)
+    if code_a.startswith("--- ERROR ---"):
+        return None
+    code_b = call_model_api(client_for(model_b_name), model_b_name, prompt, REFERENCE_IMAGE, fresh=True)
+    if code_b.startswith("--- ERROR ---"):
+        return None
+    battle = {'model_a': model_a_name, 'model_b': model_b_name, 'code_a': code_a, 'code_b': code_b}
+    if POOL_CLIPS:
+        battle['run_a'] = run_generated_code(code_a)
+        battle['run_b'] = run_generated_code(code_b)
+    return battle
 
 def save_preference(model_a_name, model_b_name, choice):
-    header = ["battle_id", "model_a", "model_b", "preference"]
-    battle_id = get_next_battle_id()
-    if not os.path.exists(PREFERENCES_FILE):
-        with open(PREFERENCES_FILE, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(header)
-    with open(PREFERENCES_FILE, "a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow([battle_id, model_a_name, model_b_name, choice])
+    battle_id = PREFERENCE_STORE.add(model_a_name, model_b_name, choice)
+    MATCHMAKER.record(model_a_name, model_b_name, PREFERENCE_WINNERS.get(choice))
     
     gr.Info(f"Feedback '{choice}' saved for Battle #{battle_id}!")
     return gr.update(value=f"### Model A ({model_a_name})"), gr.update(value=f"### Model B ({model_b_name})")
@@ -115,34 +233,89 @@ def save_preference(model_a_name, model_b_name, choice):
 def generate_bio_motion_code(user_prompt, image_path):
     if not user_prompt or user_prompt.strip() == "":
         error_update = gr.update(value="Error: User Prompt cannot be empty.", lines=5)
-        return error_update, error_update, None, None, gr.update(visible=False), None, None, "### Model A", "### Model B"
+        yield error_update, error_update, None, None, None, None, None, None, gr.update(visible=False), None, None, "### Model A", "### Model B"
+        return
     
-    if len(TOTAL_MODEL_POOL) < 2:
-        error_update = gr.update(value="Error: Total models available must be at least 2.", lines=5)
-        return error_update, error_update, None, None, gr.update(visible=False), None, None, "### Model A", "### Model B"
+    available = MODEL_REGISTRY.available()
+    if len(available) < 2:
+        error_update = gr.update(value="Error: Fewer than 2 models are responding right now. Please try again shortly.", lines=5)
+        yield error_update, error_update, None, None, None, None, None, None, gr.update(visible=False), None, None, "### Model A", "### Model B"
+        return
 
-    model_a_name, model_b_name = random.sample(TOTAL_MODEL_POOL, 2)
     base64_image = encode_image(image_path)
-    
-    client_for_a = client if model_a_name in MODEL_LIST else client_special
-    client_for_b = client if model_b_name in MODEL_LIST else client_special
-    
-    output_a = call_model_api(client_for_a, model_a_name, user_prompt, base64_image)
-    output_b = call_model_api(client_for_b, model_b_name, user_prompt, base64_image)
 
+    # an unedited reference prompt with the default image is usually ready in the pool
+    battle = BATTLE_POOL.take(user_prompt) if BATTLE_POOL is not None and base64_image == REFERENCE_IMAGE else None
+    if battle is not None and battle['model_a'] in available and battle['model_b'] in available:
+        run_a, run_b = battle.get('run_a', (None, None, None)), battle.get('run_b', (None, None, None))
+        yield (
+            gr.update(value=battle['code_a'], lines=min(len(battle['code_a'].splitlines()), MAX_CODE_LINES)),
+            gr.update(value=battle['code_b'], lines=min(len(battle['code_b'].splitlines()), MAX_CODE_LINES)),
+            run_a[0], run_b[0], run_a[1], run_b[1], run_a[2], run_b[2],
+            gr.update(visible=True),
+            battle['model_a'], battle['model_b'],
+            "### Model A", "### Model B"
+        )
+        return
+
+    if BATTLE_POOL is not None:
+        # pre-generation pauses while a user waits for a live battle
+        with BATTLE_POOL.foreground():
+            yield from _live_battle(user_prompt, base64_image, available)
+    else:
+        yield from _live_battle(user_prompt, base64_image, available)
+
+def _live_battle(user_prompt, base64_image, available):
+    # the pair whose vote would reduce leaderboard uncertainty the most, sampled
+    model_a_name, model_b_name = MATCHMAKER.choose_pair(available)
+
+    # both models stream at the same time; the UI follows whichever produces tokens
+    updates = queue.Queue()
+    for side, model_name in (("a", model_a_name), ("b", model_b_name)):
+        stream = stream_model_api(client_for(model_name), model_name, user_prompt, base64_image)
+        threading.Thread(target=_pump_stream, args=(side, stream, updates), daemon=True).start()
+
+    outputs = {"a": "", "b": ""}
+    finished = set()
+    last_yield = 0.0
+    while len(finished) < 2:
+        side, text, done = updates.get()
+        outputs[side] = text
+        if done:
+            finished.add(side)
+        # coalesce token updates so the browser is not flooded
+        if done or time.monotonic() - last_yield >= STREAM_UPDATE_INTERVAL:
+            last_yield = time.monotonic()
+            if len(finished) < 2:
+                yield (
+                    gr.update(value=outputs["a"], lines=min(len(outputs["a"].splitlines()), MAX_CODE_LINES)),
+                    gr.update(value=outputs["b"], lines=min(len(outputs["b"].splitlines()), MAX_CODE_LINES)),
+                    None, None, None, None, None, None,
+                    gr.update(visible=False),
+                    None, None,
+                    "### Model A", "### Model B"
+                )
+
+    output_a, output_b = outputs["a"], outputs["b"]
     lines_a = len(output_a.splitlines())
     lines_b = len(output_b.splitlines())
     
-    return (
+    yield (
         gr.update(value=output_a, lines=min(lines_a, MAX_CODE_LINES)),
         gr.update(value=output_b, lines=min(lines_b, MAX_CODE_LINES)),
-        None, None,
-        gr.update(visible=True),
+        None, None, None, None, None, None,
+        # no vote on a battle where a model failed to answer
+        gr.update(visible=not (output_a.startswith("--- ERROR ---") or output_b.startswith("--- ERROR ---"))),
         model_a_name, model_b_name,
         "### Model A", "### Model B"
     )
 
-def update_reference_prompt(mode, action, gender, happiness, weight):
+ACTION_CHOICES = ['walking', 'running', 'waving a hand', 'jumping up', 'jumping forward', 'bowing', 'lying down', 'sitting down', 'turning around', 'forward rolling']
+GENDER_CHOICES = ['man', 'woman']
+HAPPINESS_CHOICES = ['happy', 'sad', 'neutral']
+WEIGHT_CHOICES = ['heavy', 'light', 'normal']
+
+def build_reference_prompt(mode, action, gender, happiness, weight):
     if mode == "Basic":
         action_description = f"a man is <{action}>"
     else:
@@ -150,7 +323,20 @@ def update_reference_prompt(mode, action, gender, happiness, weight):
     question = "Question: Given an example image <image>, write a Python program that shows a point-light stimulus animation which represents biological motion.\nDetailed Requirements:\n"
     prompt_action = f"1. Subject and Action: The animation depicts {action_description}.\n"
     prompt_style_quality = "2. Visual Style: The stimulus should consist of exactly 15 white point-lights moving against a solid black background.\n3. Motion Quality: The animation must be realistic, coherent, and biomechanically plausible to accurately represent the specified human action. The movement should be smooth and natural. The style should be the same as the example image.\n"
-    reference_prompt = question + prompt_action + prompt_style_quality
+    return question + prompt_action + prompt_style_quality
+
+def standard_prompts():
+    """Every prompt the reference controls can produce, Basic mode first."""
+    prompts = [build_reference_prompt("Basic", action, None, None, None) for action in ACTION_CHOICES]
+    for action in ACTION_CHOICES:
+        for gender in GENDER_CHOICES:
+            for happiness in HAPPINESS_CHOICES:
+                for weight in WEIGHT_CHOICES:
+                    prompts.append(build_reference_prompt("Fine-grained", action, gender, happiness, weight))
+    return prompts
+
+def update_reference_prompt(mode, action, gender, happiness, weight):
+    reference_prompt = build_reference_prompt(mode, action, gender, happiness, weight)
     return gr.update(value=reference_prompt), gr.update(value=reference_prompt)
 
 def update_ui_for_mode(mode):
@@ -162,7 +348,8 @@ def update_ui_for_mode(mode):
     }
 
 # --- Gradio UI Layout ---
-with gr.Blocks(theme=gr.themes.Soft()) as demo:
+# Gradio's copies of served clips are removed an hour after they were made
+with gr.Blocks(theme=gr.themes.Soft(), delete_cache=(600, 3600)) as demo:
     model_a_state = gr.State()
     model_b_state = gr.State()
 
@@ -174,11 +361,10 @@ with gr.Blocks(theme=gr.themes.Soft()) as demo:
             gr.Markdown("### 1. Input Controls")
             image_input = gr.Image(value='./ref.png', type='filepath', label="Upload Example Image (Optional)")
             mode_radio = gr.Radio(["Basic", "Fine-grained"], label="Generation Mode", value="Basic")
-            action_list = ['walking', 'running', 'waving a hand', 'jumping up', 'jumping forward', 'bowing', 'lying down', 'sitting down', 'turning around', 'forward rolling']
-            action_dd = gr.Dropdown(action_list, label="Action", value="walking")
-            gender_dd = gr.Dropdown(['man', 'woman'], label="Gender", value="man", visible=False)
-            happiness_dd = gr.Dropdown(['happy', 'sad', 'neutral'], label="Emotion", value="happy", visible=False)
-            weight_dd = gr.Dropdown(['heavy', 'light', 'normal'], label="Weight", value="normal", visible=False)
+            action_dd = gr.Dropdown(ACTION_CHOICES, label="Action", value="walking")
+            gender_dd = gr.Dropdown(GENDER_CHOICES, label="Gender", value="man", visible=False)
+            happiness_dd = gr.Dropdown(HAPPINESS_CHOICES, label="Emotion", value="happy", visible=False)
+            weight_dd = gr.Dropdown(WEIGHT_CHOICES, label="Weight", value="normal", visible=False)
             reference_prompt_output = gr.Textbox(label="💡 Reference Prompt (Auto-Generated)", lines=8, interactive=False)
             user_prompt_input = gr.Textbox(label="✍️ Your Final Prompt (Editable)", lines=8, interactive=True)
             generate_btn = gr.Button("🚀 Generate Code", variant="primary")
@@ -190,11 +376,15 @@ with gr.Blocks(theme=gr.themes.Soft()) as demo:
                     model_a_md = gr.Markdown("### Model A")
                     code_output_a = gr.Code(label="Generated by Model A", language="python")
                     run_button_a = gr.Button("Run Code A")
+                    player_a = PointLightPlayer(visible=False)
+                    video_a = gr.Video(label="Animation A", autoplay=True, interactive=False)
                     run_output_a = gr.Textbox(label="Run Output / Status", interactive=False, lines=8)
                 with gr.Column():
                     model_b_md = gr.Markdown("### Model B")
                     code_output_b = gr.Code(label="Generated by Model B", language="python")
                     run_button_b = gr.Button("Run Code B")
+                    player_b = PointLightPlayer(visible=False)
+                    video_b = gr.Video(label="Animation B", autoplay=True, interactive=False)
                     run_output_b = gr.Textbox(label="Run Output / Status", interactive=False, lines=8)
             
             with gr.Group(visible=False) as preference_box:
@@ -212,13 +402,13 @@ with gr.Blocks(theme=gr.themes.Soft()) as demo:
         control.change(fn=update_reference_prompt, inputs=prompt_controls, outputs=[reference_prompt_output, user_prompt_input])
 
     generate_outputs = [
-        code_output_a, code_output_b, run_output_a, run_output_b,
+        code_output_a, code_output_b, player_a, player_b, video_a, video_b, run_output_a, run_output_b,
         preference_box, model_a_state, model_b_state, model_a_md, model_b_md
     ]
     generate_btn.click(fn=generate_bio_motion_code, inputs=[user_prompt_input, image_input], outputs=generate_outputs)
     
-    run_button_a.click(fn=run_generated_code, inputs=code_output_a, outputs=run_output_a)
-    run_button_b.click(fn=run_generated_code, inputs=code_output_b, outputs=run_output_b)
+    run_button_a.click(fn=run_generated_code, inputs=code_output_a, outputs=[player_a, video_a, run_output_a])
+    run_button_b.click(fn=run_generated_code, inputs=code_output_b, outputs=[player_b, video_b, run_output_b])
     
     preference_outputs = [model_a_md, model_b_md]
     left_better_btn.click(fn=save_preference, inputs=[model_a_state, model_b_state, gr.State("Left is Better")], outputs=preference_outputs)
@@ -234,6 +424,21 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run the Gradio app with API keys provided as arguments.")
     parser.add_argument('--default-key', type=str, required=True, help='API key for the default API endpoint.')
     parser.add_argument('--special-key', type=str, required=True, help='API key for the special API endpoint.')
+    parser.add_argument('--models', type=str, default='models.json', help='Model registry config: endpoint, timeout and optional slow_after per model.')
+    parser.add_argument('--cache-dir', type=str, default='.response_cache', help='Directory of the on-disk model response cache.')
+    parser.add_argument('--sandbox-workers', type=int, default=4, help='Pre-warmed processes for running generated code.')
+    parser.add_argument('--preferences-db', type=str, default='preferences.db', help='SQLite store for votes; preferences.csv is imported into it once.')
+    parser.add_argument('--cache-slots', type=int, default=1, help='Cached responses kept per request; >1 keeps repeated battles varied.')
+    parser.add_argument('--pool-quota', type=int, default=0,
+                        help='Ready battles pre-generated per standard prompt (default 0: off). Each battle is two paid API calls; '
+                             'with all 190 standard prompts that is about 380 * quota calls per --pool-max-age, even without traffic.')
+    parser.add_argument('--pool-size', type=int, default=256, help='Upper bound on pre-generated battles across all prompts.')
+    parser.add_argument('--pool-max-age', type=float, default=21600,
+                        help='Seconds after which a pre-generated battle is discarded and regenerated with new paid calls.')
+    parser.add_argument('--pool-clips', action='store_true', help='Also render the clips of pre-generated battles (sandbox time only, no API calls).')
+    parser.add_argument('--playback', choices=['points', 'video'], default='points', help='Send traced point-light trajectories to a canvas player, or rendered clips.')
+    parser.add_argument('--clip-format', choices=['mp4', 'webm'], default='mp4', help='Container of the rendered animations.')
+    parser.add_argument('--pool-workers', type=int, default=2, help='Background threads pre-generating battles.')
     args = parser.parse_args()
 
 
@@ -250,50 +455,14 @@ if __name__ == "__main__":
         api_key=DEFAULT_API_KEY
     )
 
-    MODEL_LIST = [
-        "o4-mini-2025-04-16",
-        "gpt-4o",
-        "gpt-4-turbo",
-        "o4-mini",
-        "gpt-4.1-2025-04-14",
-        "gpt-4.1-mini-2025-04-14",
-        "gpt-4o-2024-05-13",
-        "gpt-5-2025-08-07",
-        "o3",
-        "o3-mini",
-        "o3-mini-2025-01-31",
-        "grok-4",
-        "grok-3",
-        "grok-3-reasoning",
-        "claude-opus-4-20250514",
-        "claude-3-7-sonnet-20250219",
-        "claude-sonnet-4-20250514-thinking",
-        "claude-3-5-sonnet-20241022",
-        "doubao-seed-1-6-flash-250615",
-        "doubao-seed-1-6-250615",
-        "deepseek-r1-2025-01-20",
-        "deepseek-r1-250528",
-        "deepseek-v3",
-        "qwen3-235b-a22b",
-        "qwen3-coder-plus",
-        "qwen3-32b",
-        "qwen-max-latest"
-    ]
-
-
+    # models, their endpoint (default or special) and timeouts: see models.json
+    MODEL_REGISTRY = ModelRegistry.from_config(args.models)
 
     # API 2: 
     # =================================================================
     SPECIAL_API_BASE_URL = DEFAULT_API_BASE_URL 
     SPECIAL_API_KEY = SPECIAL_API_KEY     
 
-    MODEL_LIST2 = [
-        "gemini-2.5-flash",                         
-        "gemini-2.5-pro",
-        "gemini-2.0-flash",
-        "gemini-1.5-pro-latest",
-        "gemini-1.5-flash-latest",
-    ]
     # =================================================================
 
     client_special = OpenAI(
@@ -311,10 +480,44 @@ if __name__ == "__main__":
         api_key=args.special_key
     )
 
-    TOTAL_MODEL_POOL = MODEL_LIST + MODEL_LIST2
     PREFERENCES_FILE = "preferences.csv"
+    RESPONSE_CACHE = ResponseCache(args.cache_dir)
+    CACHE_SAMPLE_SLOTS = max(1, args.cache_slots)
     MAX_CODE_LINES = 50
+    STREAM_UPDATE_INTERVAL = 0.1  # seconds between streamed code updates
+    SANDBOX_POOL = SandboxPool(size=args.sandbox_workers, timeout=60)
+    CLIP_DIR = tempfile.mkdtemp(prefix="arena_clips_")
+    CLIP_FORMAT = args.clip_format
+    CLIP_SECONDS = 5
+    CLIP_FPS = 30
+    POOL_CLIPS = args.pool_clips
+    CLIP_KEEP = 64 + (2 * args.pool_size if POOL_CLIPS else 0)  # newest clips kept in CLIP_DIR
+    PLAYBACK = args.playback
+    PREFERENCE_STORE = PreferenceStore(args.preferences_db)
+    if len(PREFERENCE_STORE) == 0 and os.path.exists(PREFERENCES_FILE):
+        PREFERENCE_STORE.import_csv(PREFERENCES_FILE)
+    MATCHMAKER = Matchmaker(MODEL_REGISTRY.names())
+    MATCHMAKER.replay((model_a, model_b, PREFERENCE_WINNERS.get(preference))
+                      for _, model_a, model_b, preference in PREFERENCE_STORE.votes())
+    REFERENCE_IMAGE = encode_image('./ref.png')
+    BATTLE_POOL = None
+    if args.pool_quota > 0:
+        BATTLE_POOL = BattlePool(standard_prompts(), pregenerate_battle, quota=args.pool_quota, capacity=args.pool_size,
+                                 max_age=args.pool_max_age, workers=args.pool_workers)
+
+    # unresponsive models are probed in the background until they answer again
+    MODEL_REGISTRY.start(probe_model)
 
     print("API clients initialized successfully.")
     
-    demo.launch()
\ No newline at end of file
+    try:
+        demo.launch()
+    finally:
+        MODEL_REGISTRY.stop()
+        if BATTLE_POOL is not None:
+            BATTLE_POOL.stop()
+        SANDBOX_POOL.close()
+        # keep preferences.csv current for elo_score.py and the other tools
+        PREFERENCE_STORE.export_csv(PREFERENCES_FILE)
+        PREFERENCE_STORE.close()
+        shutil.rmtree(CLIP_DIR, ignore_errors=True)
\ No newline at end of file
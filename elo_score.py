@@ -1,5 +1,21 @@
-import pandas as pd
+import argparse
+import hashlib
+import io
+import json
 import math
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from prompt_grid import parse_script_name
+from vote_store import iter_preference_batches, iter_vote_batches, normalize_votes, read_vote_log, read_vote_store, votes_from_table
+
+try:
+    import numba
+except ImportError:  # optional; the replay loop then runs as plain Python over lists
+    numba = None
 
 # --- Configuration ---
 INITIAL_ELO = 1500
@@ -10,6 +26,13 @@ model_left, model_right, winner
 xxxx,xxxx,left/right
 """
 CSV_FILE_PATH = 'votes.csv'
+STATE_FILE = 'elo_state.json'
+
+# score of the left model; "both_bad", "tie" and anything else count as a draw
+WINNER_SCORES = {'left': 1.0, 'right': 0.0}
+
+# prompt attributes that --slices can split the leaderboard by
+SLICE_FIELDS = ['action', 'gender', 'weight', 'happiness']
 
 
 def calculate_new_ratings(rating_a, rating_b, score_a, k_factor=32):
@@ -25,49 +48,664 @@ def calculate_new_ratings(rating_a, rating_b, score_a, k_factor=32):
     return new_rating_a, new_rating_b
 
 
-def main():
+# --- Vote log ---
+
+def votes_from_frame(df):
+    """Encodes a vote table as (models, left ids, right ids, left scores).
+
+    Model names are mapped to integer ids once; the votes are then three NumPy
+    arrays that the rating engines work on directly.
+    """
+    n_votes = len(df)
+    ids, models = pd.factorize(pd.concat([df['model_left'], df['model_right']], ignore_index=True))
+    left = ids[:n_votes].astype(np.int32)
+    right = ids[n_votes:].astype(np.int32)
+    score = df['winner'].map(WINNER_SCORES).fillna(0.5).to_numpy(dtype=np.float64)
+    return list(models), left, right, score
+
+
+def _is_vote_store(path):
+    return path.endswith(('.parquet', '.arrow', '.feather'))
+
+
+def read_vote_frame(path=CSV_FILE_PATH):
+    """All columns of a vote log (any CSV layout, or the columnar vote store)."""
+    if _is_vote_store(path):
+        return read_vote_store(path).to_pandas()
+    return read_vote_log(path)
+
+
+def load_votes(csv_path=CSV_FILE_PATH):
+    if _is_vote_store(csv_path):
+        return votes_from_table(read_vote_store(csv_path))
+    # normalized like every other path, so votes with an unknown outcome are dropped with a warning
+    return votes_from_frame(read_vote_log(csv_path))
+
+
+# --- Online Elo ---
+
+def _elo_replay(left, right, score, ratings, k_factor):
+    for i in range(len(left)):
+        a = left[i]
+        b = right[i]
+        expected_a = 1.0 / (1.0 + 10.0 ** ((ratings[b] - ratings[a]) / 400.0))
+        delta = k_factor * (score[i] - expected_a)
+        ratings[a] += delta
+        ratings[b] -= delta
+    return ratings
+
+
+if numba is not None:
+    _elo_replay_jit = numba.njit(cache=True)(_elo_replay)
+
+
+def elo_ratings(left, right, score, n_models, k_factor=K_FACTOR, initial=INITIAL_ELO, start=None):
+    """Replays the votes in order with the sequential Elo update; returns ratings by id.
+
+    `start` continues from existing ratings by id instead of `initial` for everyone.
+    """
+    ratings = np.full(n_models, float(initial)) if start is None else np.array(start, dtype=np.float64)
+    if numba is not None:
+        return _elo_replay_jit(np.asarray(left), np.asarray(right), np.asarray(score, dtype=np.float64), ratings, float(k_factor))
+    # element access on Python lists is several times faster than on NumPy arrays
+    ratings = ratings.tolist()
+    _elo_replay(np.asarray(left).tolist(), np.asarray(right).tolist(), np.asarray(score).tolist(), ratings, float(k_factor))
+    return np.array(ratings)
+
+
+# --- Bradley-Terry ---
+
+def pairwise_counts(left, right, score, n_models):
+    """(n_models x n_models) matrix of points scored: wins[i, j] is what i scored against j.
+
+    Ties and "both bad" give half a point to each side, as in the Elo replay.
+    """
+    pair = np.asarray(left, dtype=np.int64) * n_models + np.asarray(right, dtype=np.int64)
+    scored = np.bincount(pair, weights=score, minlength=n_models * n_models).reshape(n_models, n_models)
+    conceded = np.bincount(pair, weights=1.0 - np.asarray(score), minlength=n_models * n_models).reshape(n_models, n_models)
+    return scored + conceded.T
+
+
+def bradley_terry_ratings(wins, initial=INITIAL_ELO, prior=0.1, max_iter=10000, tol=1e-9, start=None):
+    """Maximum-likelihood Bradley-Terry strengths on the Elo scale.
+
+    Uses the MM iteration p_i <- W_i / sum_j n_ij / (p_i + p_j) (Hunter, 2004) on
+    the aggregated win matrix, so each step costs O(models^2) whatever the number
+    of votes. `prior` adds that many drawn games to every pair that has played,
+    which keeps models without a single win finite. Ratings are 400 * log10(p),
+    shifted so that their mean is `initial`; a difference of D points means the
+    same expected score as in Elo.
+
+    `wins` may also be a stack of matrices (..., models, models), e.g. bootstrap
+    replicates; they are fitted together and ratings of shape (..., models) returned.
+    `start` optionally gives ratings to start the iteration from.
+    """
+    wins = np.asarray(wins, dtype=np.float64)
+    games = wins + np.swapaxes(wins, -1, -2)
+    played = games > 0
+    wins = wins + prior / 2 * played
+    games = games + prior * played
+    total_wins = wins.sum(axis=-1)
+
+    strength = np.ones(wins.shape[:-1])
+    if start is not None:
+        strength = strength * 10 ** ((np.asarray(start) - np.mean(start)) / 400)
+    for _ in range(max_iter):
+        denominator = (games / (strength[..., :, None] + strength[..., None, :])).sum(axis=-1)
+        updated = np.divide(total_wins, denominator, out=strength.copy(), where=denominator > 0)
+        updated /= np.exp(np.log(updated).mean(axis=-1, keepdims=True))
+        converged = np.max(np.abs(np.log(updated / strength))) < tol
+        strength = updated
+        if converged:
+            break
+    ratings = 400 * np.log10(strength)
+    return ratings - ratings.mean(axis=-1, keepdims=True) + initial
+
+
+# --- Bootstrap ---
+
+def _replay_columns(left, right, score, n_models, vote_chunks, k_factors, initial=INITIAL_ELO):
+    """Replays many vote sequences side by side; returns ratings (columns, n_models).
+
+    `vote_chunks` yields (steps, columns) arrays of vote indices: step t of
+    column c applies vote vote_chunks[t, c] to column c's ratings, with that
+    column's K factor from `k_factors`. All columns advance together, one
+    vectorized update per step.
+    """
+    k_factors = np.asarray(k_factors, dtype=np.float64)
+    n_columns = len(k_factors)
+    # flat (column, model) indices avoid 2-D fancy indexing in the inner loop
+    ratings = np.full(n_columns * n_models, float(initial))
+    offsets = np.arange(n_columns) * n_models
+    scale = np.log(10) / 400
+    for picks in vote_chunks:
+        for a, b, s in zip(left[picks] + offsets, right[picks] + offsets, score[picks]):
+            rating_a, rating_b = ratings[a], ratings[b]
+            delta = k_factors * (s - 1.0 / (1.0 + np.exp((rating_b - rating_a) * scale)))
+            ratings[a] = rating_a + delta
+            ratings[b] = rating_b - delta
+    return ratings.reshape(n_columns, n_models)
+
+
+def bootstrap_elo(left, right, score, n_models, n_rounds=1000, k_factor=K_FACTOR, initial=INITIAL_ELO, seed=0, chunk=1024):
+    """Elo ratings of `n_rounds` resampled vote logs, shape (n_rounds, n_models).
+
+    Every replicate draws len(votes) votes with replacement, in random order, and
+    all replicates are replayed side by side.
+    """
+    rng = np.random.default_rng(seed)
+    left, right, score = np.asarray(left), np.asarray(right), np.asarray(score, dtype=np.float64)
+    n_votes = len(left)
+    vote_chunks = (rng.integers(0, n_votes, (min(chunk, n_votes - start), n_rounds)) for start in range(0, n_votes, chunk))
+    return _replay_columns(left, right, score, n_models, vote_chunks, np.full(n_rounds, float(k_factor)), initial)
+
+
+def bootstrap_bradley_terry(left, right, score, n_models, n_rounds=1000, initial=INITIAL_ELO, seed=0):
+    """Bradley-Terry ratings of `n_rounds` resampled vote logs, shape (n_rounds, n_models).
+
+    Resampling votes with replacement is the same as drawing multinomial counts
+    over the distinct (left, right, outcome) cells, so no replicate touches the
+    individual votes; the replicate win matrices are then fitted as one stack.
+    """
+    rng = np.random.default_rng(seed)
+    score = np.asarray(score, dtype=np.float64)
+    cell_ids = (np.asarray(left, dtype=np.int64) * n_models + np.asarray(right, dtype=np.int64)) * 3 + np.rint(score * 2).astype(np.int64)
+    cells, counts = np.unique(cell_ids, return_counts=True)
+    pair, outcome = np.divmod(cells, 3)
+    i, j = np.divmod(pair, n_models)
+    cell_score = outcome / 2
+
+    draws = rng.multinomial(len(score), counts / counts.sum(), size=n_rounds).T.astype(np.float64)  # (cells, rounds)
+    wins = np.zeros((n_models * n_models, n_rounds))
+    np.add.at(wins, i * n_models + j, draws * cell_score[:, None])
+    np.add.at(wins, j * n_models + i, draws * (1 - cell_score)[:, None])
+    wins = wins.T.reshape(n_rounds, n_models, n_models)
+    # every replicate starts from the fit on the full log, a few MM steps away
+    point_estimate = bradley_terry_ratings(pairwise_counts(left, right, score, n_models), initial)
+    return bradley_terry_ratings(wins, initial, tol=1e-6, start=point_estimate)
+
+
+def confidence_intervals(replicates, level=0.95):
+    """Per-model rating interval and rank range over bootstrap replicates.
+
+    Ranks are 1 + the number of models rated strictly higher in that replicate.
+    """
+    tail = (1 - level) / 2 * 100
+    ranks = 1 + (replicates[:, None, :] > replicates[:, :, None]).sum(axis=-1)
+    return {
+        'low': np.percentile(replicates, tail, axis=0),
+        'high': np.percentile(replicates, 100 - tail, axis=0),
+        'rank_low': np.percentile(ranks, tail, axis=0, method='lower').astype(int),
+        'rank_high': np.percentile(ranks, 100 - tail, axis=0, method='higher').astype(int),
+    }
+
+
+# --- Vote-order sensitivity ---
+
+def permutation_elo(left, right, score, n_models, n_permutations=500, k_grid=(K_FACTOR,), initial=INITIAL_ELO, seed=0, chunk=1024):
+    """Elo ratings under random vote orders and K factors, shape (len(k_grid), n_permutations, n_models).
+
+    The orders are the rows of one (n_permutations, n_votes) index array; every
+    (order, K) combination is a column of a single side-by-side replay, so each
+    vote step updates all of them at once.
+    """
+    rng = np.random.default_rng(seed)
+    left, right, score = np.asarray(left), np.asarray(right), np.asarray(score, dtype=np.float64)
+    n_votes = len(left)
+    orders = np.empty((n_permutations, n_votes), dtype=np.int32)
+    for row in orders:
+        row[:] = rng.permutation(n_votes)
+    k_factors = np.tile(np.asarray(k_grid, dtype=np.float64), n_permutations)  # column = order * len(k_grid) + k
+    vote_chunks = (np.repeat(orders[:, start:start + chunk], len(k_grid), axis=0).T for start in range(0, n_votes, chunk))
+    ratings = _replay_columns(left, right, score, n_models, vote_chunks, k_factors, initial)
+    return ratings.reshape(n_permutations, len(k_grid), n_models).transpose(1, 0, 2)
+
 
-    try:
-        df = pd.read_csv(CSV_FILE_PATH)
-    except FileNotFoundError:
-        print(f"The file '{CSV_FILE_PATH}' was not found.")
+def rank_stability(replicates, level=0.95):
+    """confidence_intervals() plus each model's median rank and how often it holds it."""
+    stats = confidence_intervals(replicates, level)
+    ranks = 1 + (replicates[:, None, :] > replicates[:, :, None]).sum(axis=-1)
+    stats['rank_median'] = np.median(ranks, axis=0).round().astype(int)
+    stats['rank_share'] = (ranks == stats['rank_median']).mean(axis=0)
+    stats['mean'] = replicates.mean(axis=0)
+    stats['std'] = replicates.std(axis=0)
+    return stats
 
 
-    models_left = df['model_left'].unique()
-    models_right = df['model_right'].unique()
-    all_models = set(models_left) | set(models_right)
+def print_rank_stability(models, stats, title):
+    order = np.lexsort((-stats['mean'], stats['rank_median']))
+    print(f"--- {title} ---")
+    for i in order:
+        print(f"{models[i]:<15} | Elo: {stats['mean'][i]:.2f} ± {stats['std'][i]:.2f} | Rank: {stats['rank_median'][i]} "
+              f"({stats['rank_low'][i]}-{stats['rank_high'][i]}) | same rank in {stats['rank_share'][i]:.0%}")
+
+
+def print_leaderboard(models, ratings, title, intervals=None):
+    order = np.argsort(-np.asarray(ratings), kind='stable')
+    print(f"--- {title} ---")
+    for i in order:
+        if intervals is None:
+            print(f"{models[i]:<15} | Elo: {ratings[i]:.2f}")
+        else:
+            print(f"{models[i]:<15} | Elo: {ratings[i]:.2f} | 95% CI: [{intervals['low'][i]:.2f}, {intervals['high'][i]:.2f}]"
+                  f" | Rank: {intervals['rank_low'][i]}-{intervals['rank_high'][i]}")
+
+
+# --- Sliced leaderboards ---
+
+def slice_ids(df, fields=SLICE_FIELDS):
+    """Per-vote value ids of each prompt attribute, parsed from the script names.
+
+    Both scripts of a battle answer the same prompt, so `script_left` is used
+    (`script_right` where it is missing). Only the distinct names are parsed.
+    Returns {field: (ids, values)}; votes without that attribute get id -1.
+    """
+    scripts = df['script_left'].where(df['script_left'].notna(), df['script_right'])
+    script_ids, names = pd.factorize(scripts)
+    parsed = [parse_script_name(name) for name in names]
+    slices = {}
+    for field in fields:
+        value_ids, values = pd.factorize(pd.Series([info[field] for info in parsed], dtype=object))
+        ids = np.where(script_ids >= 0, np.append(value_ids, -1)[script_ids], -1)
+        slices[field] = (ids, list(values))
+    return slices
+
+
+def sliced_ratings(left, right, score, n_models, slices, mode='elo', k_factor=K_FACTOR, initial=INITIAL_ELO):
+    """Leaderboards of every value of every sliced attribute, computed in one pass.
+
+    All (field, value) slices get their own block of n_models ratings in one flat
+    array. Each vote is repeated once per field with its model ids shifted into
+    its slice's block, so a single Elo replay (or a single bincount and one
+    stacked Bradley-Terry fit) rates all slices together; votes only interact
+    with votes of the same slice. Returns {field: {value: (ratings, votes, played)}}.
+    """
+    blocks, flat_left, flat_right, flat_score, flat_slice = [], [], [], [], []
+    for field, (ids, values) in slices.items():
+        keep = ids >= 0
+        base = len(blocks)
+        blocks.extend((field, value) for value in values)
+        flat_slice.append(base + ids[keep])
+        flat_left.append((base + ids[keep]) * n_models + left[keep])
+        flat_right.append((base + ids[keep]) * n_models + right[keep])
+        flat_score.append(score[keep])
+    flat_left, flat_right = np.concatenate(flat_left), np.concatenate(flat_right)
+    flat_score, flat_slice = np.concatenate(flat_score), np.concatenate(flat_slice)
+    n_slices = len(blocks)
+
+    votes = np.bincount(flat_slice, minlength=n_slices)
+    played = (np.bincount(flat_left, minlength=n_slices * n_models) + np.bincount(flat_right, minlength=n_slices * n_models)) > 0
+    played = played.reshape(n_slices, n_models)
+    if mode == 'bt':
+        pair = flat_slice * n_models * n_models + (flat_left % n_models) * n_models + flat_right % n_models
+        scored = np.bincount(pair, weights=flat_score, minlength=n_slices * n_models * n_models)
+        conceded = np.bincount(pair, weights=1.0 - flat_score, minlength=n_slices * n_models * n_models)
+        scored = scored.reshape(n_slices, n_models, n_models)
+        wins = scored + np.swapaxes(conceded.reshape(n_slices, n_models, n_models), -1, -2)
+        ratings = bradley_terry_ratings(wins, initial)
+        # centre each slice on the models that played in it
+        centre = np.nanmean(np.where(played, ratings, np.nan), axis=-1, keepdims=True)
+        ratings = ratings - np.nan_to_num(centre, nan=initial) + initial
+    else:
+        ratings = elo_ratings(flat_left, flat_right, flat_score, n_slices * n_models, k_factor, initial).reshape(n_slices, n_models)
+
+    result = {field: {} for field in slices}
+    for block, (field, value) in enumerate(blocks):
+        result[field][value] = (ratings[block], int(votes[block]), played[block])
+    return result
+
+
+# --- Incremental state ---
+
+CHECKSUM_BYTES = 64 * 1024
+CHUNK_BYTES = 16 * 1024 * 1024  # bytes of CSV parsed at a time
+
+
+def _checksum(f, offset):
+    """sha256 of the last CHECKSUM_BYTES before `offset`: cheap, and catches a rewritten log."""
+    start = max(0, offset - CHECKSUM_BYTES)
+    f.seek(start)
+    return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+
+class LeaderboardState:
+    """Ratings after the first `offset` bytes of an append-only vote log.
+
+    Keeps the sequential Elo ratings and the pairwise win matrix (for
+    Bradley-Terry), so a refresh only parses the votes appended since the last
+    one. The checksum of the bytes just before `offset` detects a log that was
+    edited or replaced instead of appended to.
+    """
+
+    def __init__(self, csv_path=CSV_FILE_PATH, k_factor=K_FACTOR, initial=INITIAL_ELO):
+        self.csv_path = csv_path
+        self.k_factor = k_factor
+        self.initial = initial
+        self.models = []
+        self.ratings = np.zeros(0)
+        self.wins = np.zeros((0, 0))
+        self.header = None
+        self.offset = 0
+        self.votes = 0
+        self.checksum = None
+
+    @classmethod
+    def load(cls, path=STATE_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        state = cls(data['csv_path'], data['k_factor'], data['initial'])
+        state.models = data['models']
+        state.ratings = np.array(data['ratings'], dtype=np.float64)
+        state.wins = np.array(data['wins'], dtype=np.float64).reshape(len(state.models), len(state.models))
+        state.header = data['header']
+        state.offset = data['offset']
+        state.votes = data['votes']
+        state.checksum = data['checksum']
+        return state
+
+    def save(self, path=STATE_FILE):
+        data = {
+            'csv_path': self.csv_path,
+            'k_factor': self.k_factor,
+            'initial': self.initial,
+            'models': self.models,
+            'ratings': self.ratings.tolist(),
+            'wins': self.wins.tolist(),
+            'header': self.header,
+            'offset': self.offset,
+            'votes': self.votes,
+            'checksum': self.checksum,
+        }
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(path + '.tmp', path)
+
+    def is_valid_for(self, csv_path, k_factor, initial):
+        """True if the log at `csv_path` is this state's log with only appends since."""
+        if (self.csv_path, self.k_factor, self.initial) != (csv_path, k_factor, initial):
+            return False
+        if os.path.getsize(csv_path) < self.offset:
+            return False
+        with open(csv_path, 'rb') as f:
+            return _checksum(f, self.offset) == self.checksum
+
+    def _ids(self, names):
+        index = {model: i for i, model in enumerate(self.models)}
+        for model in pd.unique(names):
+            if model not in index:
+                index[model] = len(self.models)
+                self.models.append(model)
+        return names.map(index).to_numpy(dtype=np.int32)
+
+    def ingest(self, chunk_bytes=CHUNK_BYTES):
+        """Applies the complete lines appended to the log since the last call; returns their count.
+
+        The tail is parsed `chunk_bytes` at a time, so memory use does not grow
+        with the size of the log.
+        """
+        total = 0
+        with open(self.csv_path, 'rb') as f:
+            if self.offset == 0:
+                self.header = f.readline().decode('utf-8')
+                self.offset = f.tell()
+            while True:
+                f.seek(self.offset)
+                block = f.read(chunk_bytes)
+                # a vote still being written waits for the next refresh
+                end = block.rfind(b'\n') + 1
+                if end == 0:
+                    if len(block) < chunk_bytes:
+                        break
+                    chunk_bytes *= 2  # a single line longer than the chunk
+                    continue
+                if block[:end].strip():
+                    df = pd.read_csv(io.BytesIO(self.header.encode('utf-8') + block[:end]))
+                    total += self.ingest_frame(normalize_votes(df, self.csv_path))
+                self.offset += end
+            self.checksum = _checksum(f, self.offset)
+        return total
+
+    def ingest_frame(self, df):
+        """Applies a frame of votes (model_left, model_right, winner) in order; returns its length."""
+        known = len(self.models)
+        left, right = self._ids(df['model_left']), self._ids(df['model_right'])
+        score = df['winner'].map(WINNER_SCORES).fillna(0.5).to_numpy(dtype=np.float64)
+        n_models = len(self.models)
+        start = np.concatenate([self.ratings, np.full(n_models - known, float(self.initial))])
+        self.ratings = elo_ratings(left, right, score, n_models, self.k_factor, self.initial, start=start)
+        wins = np.zeros((n_models, n_models))
+        wins[:known, :known] = self.wins
+        self.wins = wins + pairwise_counts(left, right, score, n_models)
+        self.votes += len(df)
+        return len(df)
+
+
+def stream_votes(path=CSV_FILE_PATH, k_factor=K_FACTOR, initial=INITIAL_ELO, chunk_bytes=CHUNK_BYTES):
+    """Rates a vote log of any size in constant memory and returns the final state.
+
+    CSV logs are parsed in blocks of `chunk_bytes`, vote stores one record batch
+    and preferences.db databases one batch of rows at a time; each block goes straight into the Elo replay and the win matrix,
+    so only O(models^2) state is kept between blocks.
+    """
+    state = LeaderboardState(path, k_factor, initial)
+    if _is_vote_store(path):
+        for df in iter_vote_batches(path):
+            state.ingest_frame(df.astype({'model_left': object, 'model_right': object, 'winner': object}))
+    elif path.endswith('.db'):
+        for df in iter_preference_batches(path):
+            state.ingest_frame(df)
+    else:
+        state.ingest(chunk_bytes)
+    return state
+
+
+def refresh_state(csv_path=CSV_FILE_PATH, state_path=STATE_FILE, k_factor=K_FACTOR, initial=INITIAL_ELO, rebuild=False, chunk_bytes=CHUNK_BYTES):
+    """Brings the state file up to date with the vote log and returns it.
+
+    Only the appended tail is read, unless the state is missing, belongs to other
+    settings or the log was rewritten. `rebuild` replays the whole log from
+    scratch and reports whether the incremental state agreed with it.
+    """
+    if csv_path.endswith('.db') or _is_vote_store(csv_path):
+        # the state resumes from a byte offset, which only means something in an append-only CSV
+        raise ValueError("The incremental state needs a CSV vote log, not a database or columnar vote store.")
+    state = None
+    if os.path.exists(state_path):
+        state = LeaderboardState.load(state_path)
+        if not state.is_valid_for(csv_path, k_factor, initial):
+            print(f"The vote log changed or the settings differ; rebuilding '{state_path}'.")
+            state = None
+
+    if rebuild:
+        if state is not None:
+            state.ingest(chunk_bytes)
+        full = LeaderboardState(csv_path, k_factor, initial)
+        full.ingest(chunk_bytes)
+        if state is not None:
+            by_name = dict(zip(state.models, state.ratings))
+            drift = max((abs(by_name.get(model, np.inf) - rating) for model, rating in zip(full.models, full.ratings)), default=0.0)
+            if state.votes == full.votes and drift < 1e-6:
+                print(f"✅ Rebuilt from {full.votes} votes; the incremental state matched (max difference {drift:.2e}).")
+            else:
+                print(f"❌ Rebuilt from {full.votes} votes; the incremental state had {state.votes} votes and differed by {drift:.2e}.")
+        state = full
+    elif state is None:
+        state = LeaderboardState(csv_path, k_factor, initial)
+        state.ingest(chunk_bytes)
+    else:
+        state.ingest(chunk_bytes)
+    state.save(state_path)
+    return state
+
+
+# --- Benchmark ---
+
+def iterrows_elo(df, k_factor=K_FACTOR, initial=INITIAL_ELO):
+    """Row-by-row DataFrame implementation, kept as the reference for the benchmark."""
+    elo_ratings = {model: initial for model in set(df['model_left']) | set(df['model_right'])}
+    for _, row in df.iterrows():
+        score_a = WINNER_SCORES.get(row['winner'], 0.5)
+        elo_ratings[row['model_left']], elo_ratings[row['model_right']] = calculate_new_ratings(
+            elo_ratings[row['model_left']], elo_ratings[row['model_right']], score_a, k_factor)
+    return elo_ratings
+
+
+def synthetic_votes(n_votes, n_models=20, tie_rate=0.1, both_bad_rate=0.05, skew=0.0, spread=200, seed=0):
+    """Vote log drawn from known latent strengths; returns (DataFrame, strengths by model name).
+
+    Strengths are N(0, spread) on the Elo scale. Each vote pairs two distinct
+    models sampled with weights (i + 1) ** -skew over a random model order, so
+    skew=0 is uniform and larger values concentrate votes on a few models. A vote
+    is "tie" or "both_bad" with the given rates; otherwise the left model wins
+    with the Bradley-Terry probability 1 / (1 + 10 ** ((s_right - s_left) / 400)).
+    """
+    rng = np.random.default_rng(seed)
+    strength = rng.normal(0, spread, n_models)
+    weights = np.empty(n_models)
+    weights[rng.permutation(n_models)] = (np.arange(n_models) + 1.0) ** -skew
+    weights /= weights.sum()
+
+    left = rng.choice(n_models, n_votes, p=weights)
+    right = rng.choice(n_models, n_votes, p=weights)
+    clash = left == right
+    while clash.any():
+        right[clash] = rng.choice(n_models, int(clash.sum()), p=weights)
+        clash = left == right
+
+    p_left = 1 / (1 + 10 ** ((strength[right] - strength[left]) / 400))
+    draw = rng.random(n_votes)
+    winner = np.where(rng.random(n_votes) < p_left, 'left', 'right').astype(object)
+    winner[draw < tie_rate + both_bad_rate] = 'both_bad'
+    winner[draw < tie_rate] = 'tie'
+
+    names = np.array([f"model_{i:03d}" for i in range(n_models)])
+    df = pd.DataFrame({'model_left': names[left], 'model_right': names[right], 'winner': winner})
+    return df, dict(zip(names, strength))
+
+
+def benchmark(n_votes=10_000_000, n_models=20, reference_votes=20_000):
+    """Times the array engine on `n_votes` synthetic votes against iterrows on a subset."""
+    df, _ = synthetic_votes(n_votes, n_models)
+
+    start = time.perf_counter()
+    models, left, right, score = votes_from_frame(df)
+    encode_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    ratings = elo_ratings(left, right, score, len(models))
+    replay_seconds = time.perf_counter() - start
+
+    subset = df.iloc[:reference_votes]
+    start = time.perf_counter()
+    reference = iterrows_elo(subset)
+    reference_seconds = time.perf_counter() - start
+    sub_models, sub_left, sub_right, sub_score = votes_from_frame(subset)
+    sub_ratings = elo_ratings(sub_left, sub_right, sub_score, len(sub_models))
+    max_diff = max(abs(reference[m] - r) for m, r in zip(sub_models, sub_ratings))
+
+    per_vote = reference_seconds / len(subset)
+    total = encode_seconds + replay_seconds
+    print(f"--- Elo benchmark ({n_votes:,} votes, {n_models} models, numba={'yes' if numba else 'no'}) ---")
+    print(f"encode votes   : {encode_seconds:.2f}s")
+    print(f"replay votes   : {replay_seconds:.2f}s ({n_votes / replay_seconds / 1e6:.1f}M votes/s)")
+    print(f"iterrows       : {reference_seconds:.2f}s for {len(subset):,} votes, ~{per_vote * n_votes:.0f}s extrapolated "
+          f"({per_vote * n_votes / total:.0f}x slower)")
+    print(f"max |diff| vs iterrows on the subset: {max_diff:.2e}")
+    return ratings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute the Elo leaderboard from a vote log.")
+    parser.add_argument('--csv', type=str, default=CSV_FILE_PATH, help='Vote log: votes.csv, pairwise_result.csv, preferences.csv/.db or a vote_store.py .parquet/.arrow file.')
+    parser.add_argument('--k-factor', type=float, default=K_FACTOR)
+    parser.add_argument('--initial', type=float, default=INITIAL_ELO)
+    parser.add_argument('--mode', type=str, default='elo', choices=['elo', 'bt'],
+                        help="'elo': sequential online Elo; 'bt': Bradley-Terry maximum likelihood (vote-order independent).")
+    parser.add_argument('--bootstrap', type=int, default=0, metavar='ROUNDS', help='Add 95%% intervals and rank ranges from this many bootstrap replicates.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the bootstrap resampling.')
+    parser.add_argument('--permutations', type=int, default=0, metavar='N',
+                        help='Vote-order sensitivity: replay the votes in N random orders and report how stable each rank is.')
+    parser.add_argument('--k-grid', type=float, nargs='+', default=None, metavar='K',
+                        help='With --permutations: K factors to replay every order with (default: --k-factor).')
+    parser.add_argument('--state', type=str, default=None, metavar='PATH',
+                        help=f"Keep ratings in a state file (e.g. {STATE_FILE}) and only read votes appended since the last run.")
+    parser.add_argument('--rebuild', action='store_true', help='With --state: replay the whole log and check the stored state against it.')
+    parser.add_argument('--stream', action='store_true', help='Read the log in fixed-size chunks so memory stays constant for multi-GB logs.')
+    parser.add_argument('--chunk-mb', type=int, default=CHUNK_BYTES // (1024 * 1024), help='Chunk size for --stream and --state, in MiB.')
+    parser.add_argument('--slices', nargs='+', default=None, choices=SLICE_FIELDS,
+                        help='Also print one leaderboard per value of these prompt attributes, parsed from script_left/script_right.')
+    parser.add_argument('--benchmark', type=int, default=None, metavar='N_VOTES', help='Benchmark the engine on N synthetic votes instead.')
+    args = parser.parse_args()
 
-    elo_ratings = {model: INITIAL_ELO for model in all_models}
+    if args.benchmark:
+        benchmark(args.benchmark)
+        return
 
-    for index, row in df.iterrows():
-        model_a = row['model_left']
-        model_b = row['model_right']
-        winner = row['winner']
+    if (args.state or args.stream) and (args.bootstrap or args.slices or args.permutations):
+        parser.error("--bootstrap, --slices and --permutations need the full vote log and cannot be combined with --state or --stream.")
+    if args.state and (args.csv.endswith('.db') or _is_vote_store(args.csv)):
+        parser.error("--state needs a CSV vote log; use --stream for preferences.db and .parquet/.arrow vote stores.")
+    if not os.path.exists(args.csv):
+        print(f"The file '{args.csv}' was not found.")
+        return
 
-        current_elo_a = elo_ratings[model_a]
-        current_elo_b = elo_ratings[model_b]
+    if args.state or args.stream:
+        if args.state:
+            state = refresh_state(args.csv, args.state, args.k_factor, args.initial, args.rebuild, args.chunk_mb * 1024 * 1024)
+        else:
+            state = stream_votes(args.csv, args.k_factor, args.initial, args.chunk_mb * 1024 * 1024)
+        if args.mode == 'bt':
+            ratings = bradley_terry_ratings(state.wins, args.initial)
+            print_leaderboard(state.models, ratings, f"Bradley-Terry score (mean={_number(args.initial)}, scale=400)")
+        else:
+            print_leaderboard(state.models, state.ratings, f"Final Elo score (initial={_number(args.initial)}, K={_number(args.k_factor)})")
+        return
 
-        if winner == 'left':
-            score_a = 1.0  # model_a win
-        elif winner == 'right':
-            score_a = 0.0  # model_a lose
-        else:  # "both_bad", "tie"
-            score_a = 0.5  
+    if args.slices:
+        df = read_vote_frame(args.csv)
+        if df['script_left'].isna().all():
+            print(f"'{args.csv}' has no script_left/script_right columns to slice by.")
+            return
+        models, left, right, score = votes_from_frame(df)
+        title = "Bradley-Terry score" if args.mode == 'bt' else "Elo score"
+        for field, by_value in sliced_ratings(left, right, score, len(models), slice_ids(df, args.slices),
+                                              args.mode, args.k_factor, args.initial).items():
+            for value, (ratings, votes, played) in sorted(by_value.items()):
+                ids = np.flatnonzero(played)
+                print_leaderboard([models[i] for i in ids], ratings[ids], f"{title} | {field} = {value} ({votes} votes)")
+        return
 
-    
-        new_elo_a, new_elo_b = calculate_new_ratings(current_elo_a, current_elo_b, score_a, K_FACTOR)
+    models, left, right, score = load_votes(args.csv)
+    if args.permutations:
+        k_grid = args.k_grid or [args.k_factor]
+        start = time.perf_counter()
+        replicates = permutation_elo(left, right, score, len(models), args.permutations, k_grid, args.initial, args.seed)
+        seconds = time.perf_counter() - start
+        for k_factor, by_order in zip(k_grid, replicates):
+            print_rank_stability(models, rank_stability(by_order),
+                                 f"Vote-order sensitivity (K={_number(k_factor)}, {args.permutations} random orders)")
+        print(f"Replayed {len(score)} votes in {args.permutations} orders x {len(k_grid)} K values in {seconds:.1f}s.")
+        return
 
-       
-        elo_ratings[model_a] = new_elo_a
-        elo_ratings[model_b] = new_elo_b
+    intervals = None
+    if args.mode == 'bt':
+        ratings = bradley_terry_ratings(pairwise_counts(left, right, score, len(models)), args.initial)
+        title = f"Bradley-Terry score (mean={_number(args.initial)}, scale=400)"
+        if args.bootstrap:
+            intervals = confidence_intervals(bootstrap_bradley_terry(left, right, score, len(models), args.bootstrap, args.initial, args.seed))
+    else:
+        ratings = elo_ratings(left, right, score, len(models), args.k_factor, args.initial)
+        title = f"Final Elo score (initial={_number(args.initial)}, K={_number(args.k_factor)})"
+        if args.bootstrap:
+            intervals = confidence_intervals(bootstrap_elo(left, right, score, len(models), args.bootstrap, args.k_factor, args.initial, args.seed))
+    if intervals is not None:
+        title += f", {args.bootstrap} bootstrap rounds"
+    print_leaderboard(models, ratings, title, intervals)
 
-    
-    sorted_ratings = sorted(elo_ratings.items(), key=lambda item: item[1], reverse=True)
 
-    print(f"--- Final Elo score (initial={INITIAL_ELO}, K={K_FACTOR}) ---")
-    for model, rating in sorted_ratings:
-        print(f"{model:<15} | Elo: {rating:.2f}")
+def _number(value):
+    """Prints whole-number settings as before (K=32, not K=32.0)."""
+    return int(value) if float(value).is_integer() else value
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
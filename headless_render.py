@@ -0,0 +1,645 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+
+class CaptureDone(BaseException):
+    """Raised inside the script once enough frames are captured.
+
+    A BaseException so that the generated code's own `except Exception` blocks
+    do not swallow it.
+    """
+
+
+def ffmpeg_executable():
+    path = shutil.which('ffmpeg')
+    if path:
+        return path
+    try:
+        import imageio_ffmpeg
+    except ImportError:
+        raise RuntimeError("ffmpeg was not found; install it or `pip install imageio-ffmpeg`.")
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def _encoder_args(path, fps):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.webm':
+        return ['-c:v', 'libvpx-vp9', '-deadline', 'realtime', '-cpu-used', '8', '-b:v', '0', '-crf', '40', '-pix_fmt', 'yuv420p']
+    if ext == '.gif':
+        return ['-vf', f'fps={fps},split[a][b];[a]palettegen[p];[b][p]paletteuse']
+    return ['-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p', '-movflags', '+faststart']
+
+
+class ArraySink:
+    """Keeps captured RGB frames in memory."""
+
+    def __init__(self):
+        self.frames = []
+
+    def write(self, frame):
+        self.frames.append(frame)
+
+    def array(self):
+        if not self.frames:
+            return np.zeros((0, 0, 0, 3), dtype=np.uint8)
+        return np.stack(self.frames)
+
+    def close(self):
+        pass
+
+    def __len__(self):
+        return len(self.frames)
+
+
+class NullSink:
+    """Counts frames without keeping pixels; used when only trajectories are wanted."""
+
+    needs_pixels = False
+
+    def __init__(self):
+        self.count = 0
+
+    def write(self, frame):
+        self.count += 1
+
+    def close(self):
+        pass
+
+    def __len__(self):
+        return self.count
+
+
+class FFmpegSink:
+    """Pipes raw RGB frames straight into an ffmpeg encoder (MP4, WebM or GIF).
+
+    No intermediate image files are written; the clip is complete as soon as the
+    last frame has been sent.
+    """
+
+    def __init__(self, path, fps=30):
+        self.path = path
+        self.fps = fps
+        self.size = None
+        self.count = 0
+        self._process = None
+
+    def write(self, frame):
+        if self._process is None:
+            # yuv420p needs even dimensions
+            self.size = (frame.shape[0] - frame.shape[0] % 2, frame.shape[1] - frame.shape[1] % 2)
+            self._process = subprocess.Popen(
+                [ffmpeg_executable(), '-y', '-loglevel', 'error',
+                 '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{self.size[1]}x{self.size[0]}', '-r', str(self.fps),
+                 '-i', '-'] + _encoder_args(self.path, self.fps) + [self.path],
+                stdin=subprocess.PIPE,
+            )
+        self._process.stdin.write(np.ascontiguousarray(_fit(frame, self.size)).tobytes())
+        self.count += 1
+
+    def close(self):
+        if self._process is not None:
+            self._process.stdin.close()
+            if self._process.wait() != 0:
+                raise RuntimeError(f"ffmpeg failed to encode '{self.path}'")
+
+    def __len__(self):
+        return self.count
+
+
+def _fit(frame, size):
+    """Crops or zero-pads a frame to (height, width) so every frame matches the first."""
+    h, w = size
+    if frame.shape[0] == h and frame.shape[1] == w:
+        return frame
+    out = np.zeros((h, w, 3), dtype=np.uint8)
+    ch, cw = min(h, frame.shape[0]), min(w, frame.shape[1])
+    out[:ch, :cw] = frame[:ch, :cw]
+    return out
+
+
+def encode_frames(frames, path, fps=30):
+    """Writes a (frames, height, width, 3) uint8 array to .npy, .mp4, .webm or .gif."""
+    if path.endswith('.npy'):
+        np.save(path, frames)
+        return path
+    sink = FFmpegSink(path, fps)
+    for frame in frames:
+        sink.write(frame)
+    sink.close()
+    return path
+
+
+class _VirtualClock:
+    """Replaces wall-clock time inside the script so every run renders the same frames."""
+
+    def __init__(self, fps, start=1_700_000_000.0):
+        self.start = start
+        self.elapsed = 0.0
+        self.frame_seconds = 1.0 / fps
+
+    def time(self):
+        return self.start + self.elapsed
+
+    def perf_counter(self):
+        return self.elapsed
+
+    def sleep(self, seconds):
+        self.elapsed += max(0.0, seconds)
+
+    def next_frame(self):
+        self.elapsed += self.frame_seconds
+
+
+class FrameCapture:
+    """Hooks matplotlib and pygame so a script renders offscreen into `sink`.
+
+    - matplotlib is forced onto the Agg backend; `plt.show()` steps every
+      registered Animation frame by frame instead of opening a window, and
+      `plt.pause()` grabs the current figure.
+    - pygame runs on the SDL dummy video driver; every `display.flip()` or
+      `display.update()` grabs the display surface and `Clock.tick()` no
+      longer sleeps.
+    After `n_frames` frames CaptureDone ends the script.
+    """
+
+    def __init__(self, sink, n_frames=60, fps=30, seed=0, tracer=None):
+        self.sink = sink
+        self.n_frames = n_frames
+        self.clock = _VirtualClock(fps)
+        self.seed = seed
+        self.tracer = tracer
+        self.animations = []
+        self.needs_pixels = getattr(sink, 'needs_pixels', True)
+
+    def emit(self, frame):
+        if self.tracer is not None:
+            self.tracer.snapshot()
+        self.sink.write(frame)
+        self.clock.next_frame()
+        if len(self.sink) >= self.n_frames:
+            raise CaptureDone()
+
+    # --- matplotlib ---
+
+    def _grab_figure(self, fig):
+        if not self.needs_pixels:
+            return None
+        fig.canvas.draw()
+        return np.asarray(fig.canvas.buffer_rgba())[..., :3].copy()
+
+    @staticmethod
+    def _unanimate(anim):
+        # blit=True marks the returned artists animated, and a full canvas draw skips those
+        for artist in getattr(anim, '_drawn_artists', None) or []:
+            artist.set_animated(False)
+
+    def _play_animation(self, anim):
+        fig = anim._fig
+        anim._init_draw()
+        self._unanimate(anim)
+        while True:
+            frames = iter(anim.new_frame_seq())
+            first = next(frames, None)
+            if first is None:
+                break
+            for framedata in itertools.chain([first], frames):
+                anim._draw_next_frame(framedata, blit=False)
+                self._unanimate(anim)
+                self.emit(self._grab_figure(fig))
+            if not getattr(anim, '_repeat', True):
+                break
+
+    def _show(self):
+        import matplotlib.pyplot as plt
+        animations, self.animations = self.animations, []
+        for anim in animations:
+            self._play_animation(anim)
+        if not animations and plt.get_fignums():
+            self.emit(self._grab_figure(plt.gcf()))
+
+    def _pause(self, interval=0):
+        import matplotlib.pyplot as plt
+        self.clock.sleep(interval)
+        if plt.get_fignums():
+            self.emit(self._grab_figure(plt.gcf()))
+
+    def _install_matplotlib(self):
+        import matplotlib
+        matplotlib.use('Agg', force=True)
+        matplotlib.use = lambda *args, **kwargs: None
+        import matplotlib.animation as animation
+        import matplotlib.pyplot as plt
+
+        capture = self
+        original_init = animation.Animation.__init__
+
+        def register(anim, *args, **kwargs):
+            original_init(anim, *args, **kwargs)
+            capture.animations.append(anim)  # also keeps it from being garbage-collected
+
+        def show(*args, **kwargs):
+            capture._show()
+
+        def pause(interval=0):
+            capture._pause(interval)
+
+        plt.switch_backend('Agg')
+        animation.Animation.__init__ = register
+        plt.show = show
+        plt.pause = pause
+
+    # --- pygame ---
+
+    def _grab_surface(self, *args, **kwargs):
+        import pygame
+        surface = pygame.display.get_surface()
+        if surface is not None and not self.needs_pixels:
+            self.emit(None)
+        elif surface is not None:
+            w, h = surface.get_size()
+            frame = np.frombuffer(pygame.image.tobytes(surface, 'RGB'), dtype=np.uint8).reshape(h, w, 3)
+            self.emit(frame.copy())
+
+    def _install_pygame(self):
+        import pygame
+        clock = self.clock
+
+        class Clock:
+            def __init__(self):
+                self._last = 0
+                self._fps = 0.0
+
+            def tick(self, framerate=0):
+                now = int(clock.elapsed * 1000)
+                delta, self._last = now - self._last, now
+                self._fps = framerate
+                return delta
+
+            tick_busy_loop = tick
+
+            def get_time(self):
+                return int(clock.frame_seconds * 1000)
+
+            get_rawtime = get_time
+
+            def get_fps(self):
+                return float(self._fps)
+
+        pygame.time.Clock = Clock
+        pygame.time.get_ticks = lambda: int(clock.elapsed * 1000)
+        pygame.time.delay = pygame.time.wait = lambda ms: (clock.sleep(ms / 1000.0), ms)[1]
+        pygame.display.flip = self._grab_surface
+        pygame.display.update = self._grab_surface
+
+    def install(self, source=""):
+        os.environ['MPLBACKEND'] = 'Agg'
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        os.environ['SDL_AUDIODRIVER'] = 'dummy'
+        os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+        import time
+        time.time = self.clock.time
+        time.perf_counter = self.clock.perf_counter
+        time.sleep = self.clock.sleep
+        random.seed(self.seed)
+        np.random.seed(self.seed)
+        self._install_matplotlib()
+        if 'pygame' in source:
+            try:
+                self._install_pygame()
+            except ImportError:
+                pass
+        if self.tracer is not None:
+            self.tracer.install(source)
+
+    def run(self, script_path):
+        """Runs the script under the hooks; returns the number of captured frames."""
+        with open(script_path, 'r', encoding='utf-8') as f:
+            source = f.read()
+        self.install(source)
+        sys.argv = [script_path]
+        try:
+            runpy.run_path(script_path, run_name='__main__')
+            # the script returned without plt.show(): play what it set up
+            if len(self.sink) == 0:
+                self._show()
+        except CaptureDone:
+            pass
+        except SystemExit:
+            pass
+        finally:
+            self.sink.close()
+        return len(self.sink)
+
+
+_NO_MARKER = (None, 'None', 'none', '', ' ')
+
+
+class PointTracer:
+    """Records the point-light positions a script sets, one row per captured frame.
+
+    matplotlib: every artist that goes through Axes.scatter, Collection.set_offsets,
+    Line2D.set_data/set_xdata/set_ydata (marker lines only) or a Circle/Ellipse
+    centre update is tracked, and the current data-space positions of the tracked
+    artists that are drawn in an Axes are read at each frame. pygame: the centres
+    of all draw.circle / gfxdraw circle calls since the previous display flip, in
+    pixels (y pointing down). `limits` holds (x_min, x_max, y_min, y_max) of the
+    space the points live in at the last frame: the axis limits of the first Axes
+    with a tracked point, or the size of the pygame display.
+    """
+
+    def __init__(self):
+        self.artists = {}  # id(artist) -> artist, in first-seen order
+        self.circles = []
+        self.frames = []
+        self.coords = 'data'
+        self.limits = None
+
+    def track(self, artist):
+        self.artists.setdefault(id(artist), artist)
+
+    def _install_matplotlib(self):
+        from matplotlib.axes import Axes
+        from matplotlib.collections import Collection
+        from matplotlib.lines import Line2D
+        from matplotlib.patches import Ellipse
+
+        tracer = self
+        original_scatter = Axes.scatter
+        original_set_offsets = Collection.set_offsets
+        original_set_center = Ellipse.set_center
+
+        def scatter(ax, *args, **kwargs):
+            collection = original_scatter(ax, *args, **kwargs)
+            tracer.track(collection)
+            return collection
+
+        def set_offsets(collection, offsets):
+            original_set_offsets(collection, offsets)
+            tracer.track(collection)
+
+        def set_center(patch, xy):
+            original_set_center(patch, xy)
+            tracer.track(patch)
+
+        def wrap_line_setter(original):
+            def setter(line, *args, **kwargs):
+                original(line, *args, **kwargs)
+                if line.get_marker() not in _NO_MARKER:
+                    tracer.track(line)
+            return setter
+
+        Axes.scatter = scatter
+        Collection.set_offsets = set_offsets
+        Ellipse.set_center = set_center
+        Ellipse.center = property(Ellipse.get_center, set_center)
+        Line2D.set_data = wrap_line_setter(Line2D.set_data)
+        Line2D.set_xdata = wrap_line_setter(Line2D.set_xdata)
+        Line2D.set_ydata = wrap_line_setter(Line2D.set_ydata)
+
+    def _install_pygame(self):
+        import pygame
+        import pygame.gfxdraw
+
+        tracer = self
+        original_circle = pygame.draw.circle
+
+        def circle(surface, color, center, radius, *args, **kwargs):
+            tracer.circles.append((float(center[0]), float(center[1])))
+            return original_circle(surface, color, center, radius, *args, **kwargs)
+
+        def wrap_gfx_circle(original):
+            def gfx_circle(surface, x, y, r, color):
+                tracer.circles.append((float(x), float(y)))
+                return original(surface, x, y, r, color)
+            return gfx_circle
+
+        pygame.draw.circle = circle
+        for name in ('circle', 'aacircle', 'filled_circle'):
+            setattr(pygame.gfxdraw, name, wrap_gfx_circle(getattr(pygame.gfxdraw, name)))
+
+    def install(self, source=""):
+        self._install_matplotlib()
+        if 'pygame' in source:
+            try:
+                self._install_pygame()
+            except ImportError:
+                pass
+
+    def _artist_points(self, artist):
+        from matplotlib.collections import Collection
+        from matplotlib.lines import Line2D
+
+        axes = artist.axes
+        if axes is None or not artist.get_visible():
+            return None
+        if isinstance(artist, Line2D):
+            if not any(artist is line for line in axes.lines) or artist.get_marker() in _NO_MARKER:
+                return None
+            xy = artist.get_xydata()
+        elif isinstance(artist, Collection):
+            if not any(artist is collection for collection in axes.collections):
+                return None
+            xy = artist.get_offsets()
+        else:
+            if not any(artist is patch for patch in axes.patches):
+                return None
+            xy = [artist.get_center()]
+        try:
+            return np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        except (TypeError, ValueError):
+            return None
+
+    def snapshot(self):
+        points, limits = [], None
+        for artist in self.artists.values():
+            xy = self._artist_points(artist)
+            if xy is not None:
+                points.append(xy)
+                limits = limits or tuple(artist.axes.get_xlim()) + tuple(artist.axes.get_ylim())
+        if self.circles:
+            self.coords = 'pixels'
+            points.append(np.asarray(self.circles, dtype=np.float64))
+            self.circles = []
+            import pygame
+            surface = pygame.display.get_surface()
+            if surface is not None:
+                limits = (0, surface.get_width(), 0, surface.get_height())
+        if limits is not None:
+            self.limits = tuple(float(v) for v in limits)
+        self.frames.append(np.concatenate(points) if points else np.zeros((0, 2)))
+
+    def limits_array(self):
+        """`limits` as a float64 array of 4, NaN if unknown, for saving next to array()."""
+        return np.asarray(self.limits if self.limits is not None else [np.nan] * 4, dtype=np.float64)
+
+    def array(self):
+        """(frames, points, 2) float32; frames with fewer points are NaN-padded."""
+        n_points = max((len(f) for f in self.frames), default=0)
+        out = np.full((len(self.frames), n_points, 2), np.nan, dtype=np.float32)
+        for i, frame in enumerate(self.frames):
+            out[i, :len(frame)] = frame
+        return out
+
+
+def trace_script(script_path, n_frames=120, fps=30, seed=0, timeout=120):
+    """Runs a script headless and returns (trajectory, coords, limits).
+
+    `trajectory` is a (frames, points, 2) float32 array of point-light positions;
+    `coords` is 'data' for matplotlib data coordinates or 'pixels' for pygame;
+    `limits` is (x_min, x_max, y_min, y_max) of the axes or the display, or
+    None if no point was drawn. The script runs in a temporary directory, so
+    files it saves are discarded.
+    """
+    tmp_dir = tempfile.mkdtemp(prefix="trace_")
+    target = os.path.join(tmp_dir, "trajectory.npz")
+    job = {'script': os.path.abspath(script_path), 'trace': target, 'frames': n_frames, 'fps': fps, 'seed': seed}
+    try:
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', json.dumps(job)],
+            cwd=tmp_dir,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+        if result.returncode != 0 or not os.path.exists(target):
+            raise RuntimeError(f"Tracing '{script_path}' failed:\n{result.stderr.strip()[-2000:]}")
+        with np.load(target) as data:
+            limits = tuple(float(v) for v in data['limits'])
+            return data['points'], str(data['coords']), limits if np.isfinite(limits).all() else None
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def render_script(script_path, out_path=None, n_frames=60, fps=30, seed=0, timeout=120):
+    """Renders a BioMotion script headless in a child process.
+
+    With `out_path` (.npy, .mp4, .webm or .gif) the frames are written there and
+    the path is returned; otherwise the frames are returned as a
+    (frames, height, width, 3) uint8 array. The script runs in a temporary
+    directory, so files it saves (e.g. `ani.save`) are discarded.
+    """
+    tmp_dir = tempfile.mkdtemp(prefix="render_")
+    target = os.path.join(tmp_dir, "frames.npy") if out_path is None else os.path.abspath(out_path)
+    job = {'script': os.path.abspath(script_path), 'out': target, 'frames': n_frames, 'fps': fps, 'seed': seed}
+    try:
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', json.dumps(job)],
+            cwd=tmp_dir,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+        if result.returncode != 0 or not os.path.exists(target):
+            raise RuntimeError(f"Rendering '{script_path}' failed:\n{result.stderr.strip()[-2000:]}")
+        if out_path is None:
+            return np.load(target)
+        return out_path
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+_BLIT_CHECK_SCRIPT = """
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.animation import FuncAnimation
+
+fig, ax = plt.subplots()
+fig.patch.set_facecolor('black')
+ax.set_facecolor('black')
+ax.set_xlim(-2, 2)
+ax.set_ylim(-1, 15)
+points, = ax.plot([], [], 'wo', markersize=6)
+
+def update(i):
+    points.set_data(np.sin(i / 5 + np.arange(15)), np.arange(15))
+    return points,
+
+animation = FuncAnimation(fig, update, frames=100, interval=33, blit={blit})
+plt.show()
+"""
+
+
+def check_blit(n_frames=5):
+    """Renders the same animation with blit=True and blit=False; returns the fewest lit pixels per frame of each.
+
+    FuncAnimation(blit=True) marks the point artists animated, which a plain
+    canvas draw skips; both counts must be well above zero.
+    """
+    tmp_dir = tempfile.mkdtemp(prefix="check_")
+    try:
+        counts = {}
+        for blit in (True, False):
+            script_path = os.path.join(tmp_dir, f"blit_{blit}.py")
+            with open(script_path, 'w', encoding='utf-8') as f:
+                f.write(_BLIT_CHECK_SCRIPT.format(blit=blit))
+            frames = render_script(script_path, n_frames=n_frames)
+            counts[blit] = int((frames.min(axis=-1) > 200).sum(axis=(1, 2)).min())
+        return counts
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _child_main(job):
+    out = job.get('out')
+    if out is None:
+        sink = NullSink()
+    elif out.endswith('.npy'):
+        sink = ArraySink()
+    else:
+        sink = FFmpegSink(out, job['fps'])
+    tracer = PointTracer() if job.get('trace') else None
+    sys.path[0] = os.path.dirname(job['script'])
+    captured = FrameCapture(sink, job['frames'], job['fps'], job['seed'], tracer).run(job['script'])
+    if captured == 0:
+        print("No frames were rendered.", file=sys.stderr)
+        return 1
+    if isinstance(sink, ArraySink):
+        np.save(out, sink.array())
+    if tracer is not None:
+        np.savez(job['trace'], points=tracer.array(), coords=tracer.coords, limits=tracer.limits_array())
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == '--child':
+        code = 1
+        try:
+            code = _child_main(json.loads(sys.argv[2]))
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+    parser = argparse.ArgumentParser(description="Render a point-light script offscreen to .npy, .mp4, .webm or .gif.")
+    parser.add_argument('script', type=str, nargs='?')
+    parser.add_argument('--out', type=str, default=None, help='Output file; defaults to <script>.mp4')
+    parser.add_argument('--frames', type=int, default=60, help='Number of frames to capture.')
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=int, default=120)
+    parser.add_argument('--check', action='store_true', help='Check that blit=True animations render their point-lights.')
+    args = parser.parse_args()
+
+    if args.check:
+        counts = check_blit()
+        ok = all(count > 0 for count in counts.values())
+        print(f"{'✅' if ok else '❌'} Lit pixels per frame: blit=True {counts[True]}, blit=False {counts[False]}")
+        sys.exit(0 if ok else 1)
+    if args.script is None:
+        parser.error("a script is required unless --check is given")
+
+    out_path = args.out or os.path.splitext(args.script)[0] + '.mp4'
+    render_script(args.script, out_path, args.frames, args.fps, args.seed, args.timeout)
+    print(f"✅ Rendered '{args.script}' to '{out_path}'")
@@ -0,0 +1,205 @@
+import argparse
+import copy
+import time
+
+import torch
+from transformers import StoppingCriteria, StoppingCriteriaList
+
+
+def render_chat(tokenizer, system_prompt, prompt):
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt}
+    ]
+    if tokenizer.chat_template is None:
+        # tiny test models often ship without a chat template
+        return system_prompt + "\n\n" + prompt + "\n\n"
+    return tokenizer.apply_chat_template(
+        messages,
+        tokenize=False,
+        add_generation_prompt=True
+    )
+
+
+class FinishedSequenceCallback(StoppingCriteria):
+    """Hands every sequence of a batch to `on_finished` the step it emits EOS.
+
+    It never stops generation itself; it only lets finished rows be written out
+    while the longer rows of the same batch are still decoding.
+    """
+
+    def __init__(self, prompt_length, eos_token_ids, on_finished):
+        self.prompt_length = prompt_length
+        self.eos_token_ids = set(eos_token_ids)
+        self.on_finished = on_finished
+        self.finished = set()
+
+    def __call__(self, input_ids, scores, **kwargs):
+        last_tokens = input_ids[:, -1].tolist()
+        for row, token in enumerate(last_tokens):
+            if row not in self.finished and token in self.eos_token_ids:
+                self.finished.add(row)
+                self.on_finished(row, input_ids[row, self.prompt_length:])
+        return torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+
+
+def _eos_token_ids(model, tokenizer):
+    eos = model.generation_config.eos_token_id
+    if eos is None:
+        eos = tokenizer.eos_token_id
+    return eos if isinstance(eos, list) else [eos]
+
+
+def common_prefix_length(token_lists):
+    """Number of leading tokens shared by every list, leaving each at least one token."""
+    shortest = min(len(ids) for ids in token_lists)
+    length = 0
+    while length < shortest - 1 and all(ids[length] == token_lists[0][length] for ids in token_lists):
+        length += 1
+    return length
+
+
+class PrefixCache:
+    """KV cache of the token prefix shared by every prompt of the grid.
+
+    The system message and most of the question text are identical across cells,
+    so they are prefilled once per batch size and every batch only prefills its
+    own differing suffix tokens.
+    """
+
+    def __init__(self, model, prefix_ids):
+        self.model = model
+        self.prefix_ids = prefix_ids
+        self._caches = {}
+
+    def __len__(self):
+        return len(self.prefix_ids)
+
+    def for_batch(self, batch_size):
+        if batch_size not in self._caches:
+            prefix = torch.tensor([self.prefix_ids] * batch_size, device=self.model.device)
+            with torch.no_grad():
+                self._caches[batch_size] = self.model(input_ids=prefix, use_cache=True).past_key_values
+        # generate() extends the cache in place, so every batch works on a copy
+        return copy.deepcopy(self._caches[batch_size])
+
+
+def _prefix_batch_inputs(prefix_cache, token_lists, pad_token_id, device):
+    """[shared prefix | left-padded suffix] ids with the matching attention mask."""
+    prefix_length = len(prefix_cache)
+    suffixes = [ids[prefix_length:] for ids in token_lists]
+    suffix_length = max(len(ids) for ids in suffixes)
+    input_ids, attention_mask = [], []
+    for ids in suffixes:
+        padding = suffix_length - len(ids)
+        input_ids.append(prefix_cache.prefix_ids + [pad_token_id] * padding + ids)
+        attention_mask.append([1] * prefix_length + [0] * padding + [1] * len(ids))
+    return {
+        'input_ids': torch.tensor(input_ids, device=device),
+        'attention_mask': torch.tensor(attention_mask, device=device),
+        'past_key_values': prefix_cache.for_batch(len(token_lists)),
+    }
+
+
+def generate_batched(model, tokenizer, items, system_prompt, on_output, batch_size=8, max_new_tokens=32768, reuse_prefix=True):
+    """Generates responses for `items`, a list of (key, prompt), in left-padded batches.
+
+    `on_output(key, response)` is called as soon as each sequence finishes, not when
+    its whole batch does. With `reuse_prefix` the KV cache of the prefix common to
+    all prompts is computed once and shared by every batch. Returns throughput
+    statistics for the run.
+    """
+    tokenizer.padding_side = 'left'
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    eos_token_ids = _eos_token_ids(model, tokenizer)
+
+    texts = [(key, render_chat(tokenizer, system_prompt, prompt)) for key, prompt in items]
+    # similar lengths in one batch keep the padding small
+    texts.sort(key=lambda item: len(item[1]))
+
+    prefix_cache = None
+    if reuse_prefix and texts:
+        token_lists = [tokenizer(text).input_ids for _, text in texts]
+        prefix_length = common_prefix_length(token_lists)
+        if prefix_length > 0:
+            prefix_cache = PrefixCache(model, token_lists[0][:prefix_length])
+
+    generated_tokens = 0
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        batch = texts[i:i + batch_size]
+        if prefix_cache is not None:
+            model_inputs = _prefix_batch_inputs(prefix_cache, token_lists[i:i + batch_size], tokenizer.pad_token_id, model.device)
+        else:
+            model_inputs = tokenizer([text for _, text in batch], return_tensors="pt", padding=True).to(model.device)
+        prompt_length = model_inputs['input_ids'].shape[1]
+
+        def emit(row, new_ids):
+            nonlocal generated_tokens
+            generated_tokens += len(new_ids)
+            on_output(batch[row][0], tokenizer.decode(new_ids, skip_special_tokens=True))
+
+        callback = FinishedSequenceCallback(prompt_length, eos_token_ids, emit)
+        output_ids = model.generate(
+            **model_inputs,
+            max_new_tokens=max_new_tokens,
+            pad_token_id=tokenizer.pad_token_id,
+            stopping_criteria=StoppingCriteriaList([callback])
+        )
+        # rows that ran into max_new_tokens without emitting EOS
+        for row in range(len(batch)):
+            if row not in callback.finished:
+                callback.finished.add(row)
+                emit(row, output_ids[row, prompt_length:])
+
+    seconds = time.perf_counter() - start
+    stats = {
+        'prompts': len(texts),
+        'generated_tokens': generated_tokens,
+        'prefix_tokens': len(prefix_cache) if prefix_cache is not None else 0,
+        'seconds': seconds,
+        'prompts_per_second': len(texts) / seconds if seconds else 0.0,
+        'tokens_per_second': generated_tokens / seconds if seconds else 0.0,
+    }
+    print(f"Generated {stats['prompts']} prompts / {stats['generated_tokens']} tokens in {seconds:.1f}s "
+          f"({stats['prompts_per_second']:.2f} prompts/s, {stats['tokens_per_second']:.1f} tokens/s)")
+    return stats
+
+
+def benchmark_prefix_reuse(model, tokenizer, batch_size=1, max_new_tokens=16):
+    """Times the prompt grid with and without the shared-prefix KV cache (greedy decoding)."""
+    from prompt_grid import SYSTEM_PROMPT_MLLM, basic_cells, fine_cells
+
+    cells = fine_cells() + basic_cells()
+    items = [(i, cell.prompt) for i, cell in enumerate(cells)]
+    results = {}
+    for reuse_prefix in (False, True):
+        outputs = {}
+        stats = generate_batched(model, tokenizer, items, SYSTEM_PROMPT_MLLM, outputs.__setitem__,
+                                 batch_size=batch_size, max_new_tokens=max_new_tokens, reuse_prefix=reuse_prefix)
+        results[reuse_prefix] = (stats, outputs)
+
+    (plain, plain_outputs), (reused, reused_outputs) = results[False], results[True]
+    matching = sum(plain_outputs[key] == reused_outputs[key] for key in plain_outputs)
+    print(f"--- Prefix reuse benchmark ({len(items)} prompts, batch size {batch_size}, {max_new_tokens} new tokens) ---")
+    print(f"shared prefix       : {reused['prefix_tokens']} tokens")
+    print(f"without prefix reuse: {plain['seconds']:.2f}s")
+    print(f"with prefix reuse   : {reused['seconds']:.2f}s ({plain['seconds'] / reused['seconds']:.2f}x)")
+    print(f"identical outputs   : {matching}/{len(items)}")
+    return plain, reused
+
+
+if __name__ == "__main__":
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    parser = argparse.ArgumentParser(description="Benchmark shared-prefix KV cache reuse on a small local model.")
+    parser.add_argument('--model', type=str, default="Qwen/Qwen2.5-0.5B-Instruct", help='Model name or local path.')
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--max-new-tokens', type=int, default=16)
+    args = parser.parse_args()
+
+    model = AutoModelForCausalLM.from_pretrained(args.model, torch_dtype=torch.float32)
+    model.generation_config.do_sample = False
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    benchmark_prefix_reuse(model, tokenizer, batch_size=args.batch_size, max_new_tokens=args.max_new_tokens)
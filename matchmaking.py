@@ -0,0 +1,116 @@
+import math
+import random
+import threading
+from collections import Counter, defaultdict
+
+# --- Configuration ---
+INITIAL_RATING = 1500
+PRIOR_SD = 350  # rating uncertainty of a model without votes, in Elo points
+SHARPNESS = 4  # how strongly sampling prefers the most informative battles; 0 is uniform
+
+# score of the left model; "both_bad", "tie" and anything else count as a draw
+WINNER_SCORES = {'left': 1.0, 'right': 0.0}
+
+_SCALE = math.log(10) / 400
+
+
+class Matchmaker:
+    """Chooses the battles whose votes tell the leaderboard the most.
+
+    Every model has a Gaussian belief over its rating (mean and variance on the
+    Elo scale). A vote updates both beliefs with one Newton step of the
+    Bradley-Terry likelihood, which shrinks their variances by the vote's Fisher
+    information c^2 p (1 - p). A pair is worth what one more vote would remove
+    from the two variances, so close pairs of uncertain models score highest and
+    pairs whose outcome is already clear score lowest. Battles are sampled with
+    probability proportional to score ** SHARPNESS, so parallel users do not all
+    get the same pair. Thread-safe.
+    """
+
+    def __init__(self, models, initial=INITIAL_RATING, prior_sd=PRIOR_SD, sharpness=SHARPNESS, seed=None):
+        self.pool = list(models)
+        self.initial = initial
+        self.prior_var = prior_sd ** 2
+        self.sharpness = sharpness
+        self.mean = {}
+        self.var = {}
+        self.pair_actions = defaultdict(Counter)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        for model in self.pool:
+            self._add(model)
+
+    def _add(self, model):
+        if model not in self.mean:
+            self.mean[model] = float(self.initial)
+            self.var[model] = float(self.prior_var)
+
+    def record(self, model_left, model_right, winner, action=None):
+        """Updates the beliefs with one vote; `winner` is left/right/tie/both_bad."""
+        with self._lock:
+            self._add(model_left)
+            self._add(model_right)
+            p = 1 / (1 + math.exp(-_SCALE * (self.mean[model_left] - self.mean[model_right])))
+            gradient = _SCALE * (WINNER_SCORES.get(winner, 0.5) - p)
+            information = _SCALE ** 2 * p * (1 - p)
+            for model, sign in ((model_left, 1), (model_right, -1)):
+                self.var[model] = 1 / (1 / self.var[model] + information)
+                self.mean[model] += sign * self.var[model] * gradient
+            if action is not None:
+                self.pair_actions[frozenset((model_left, model_right))][action] += 1
+
+    def replay(self, votes):
+        """Records (model_left, model_right, winner[, action]) votes in order, e.g. from a vote log."""
+        count = 0
+        for vote in votes:
+            self.record(*vote)
+            count += 1
+        return count
+
+    def pair_value(self, model_a, model_b):
+        """Expected drop in the summed rating variance of both models from one more vote."""
+        p = 1 / (1 + math.exp(-_SCALE * (self.mean[model_a] - self.mean[model_b])))
+        information = _SCALE ** 2 * p * (1 - p)
+        return sum(self.var[m] ** 2 * information / (1 + self.var[m] * information) for m in (model_a, model_b))
+
+    def _sample(self, options, values):
+        weights = [value ** self.sharpness for value in values]
+        return self._rng.choices(options, weights=weights)[0]
+
+    def choose_pair(self, models=None):
+        """Two distinct models from `models` (default: the pool), in random left/right order."""
+        models = self.pool if models is None else list(models)
+        with self._lock:
+            for model in models:
+                self._add(model)
+            pairs = [(a, b) for i, a in enumerate(models) for b in models[i + 1:]]
+            pair = self._sample(pairs, [self.pair_value(a, b) for a, b in pairs])
+        return pair if self._rng.random() < 0.5 else pair[::-1]
+
+    def choose(self, candidates, pair_of, action_of=None):
+        """Picks one of `candidates`, e.g. the (models, scripts) items of a comparison pool.
+
+        `pair_of(candidate)` gives its two models and `action_of(candidate)` its
+        action; among the candidates of the chosen pair, the action this pair has
+        been compared on least often is preferred.
+        """
+        by_pair = defaultdict(list)
+        for candidate in candidates:
+            by_pair[frozenset(pair_of(candidate))].append(candidate)
+        with self._lock:
+            for pair in by_pair:
+                for model in pair:
+                    self._add(model)
+            pairs = list(by_pair)
+            pair = self._sample(pairs, [self.pair_value(*sorted(p)) for p in pairs])
+            options = by_pair[pair]
+            if action_of is not None:
+                seen = self.pair_actions[pair]
+                fewest = min(seen[action_of(c)] for c in options)
+                options = [c for c in options if seen[action_of(c)] == fewest]
+            return self._rng.choice(options)
+
+    def leaderboard(self):
+        """(model, mean, sd) sorted by mean rating."""
+        with self._lock:
+            return sorted(((m, self.mean[m], math.sqrt(self.var[m])) for m in self.mean), key=lambda item: -item[1])
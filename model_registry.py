@@ -0,0 +1,188 @@
+import argparse
+import json
+import statistics
+import threading
+import time
+from collections import deque
+
+# --- Configuration ---
+MODELS_FILE = 'models.json'
+DEFAULT_TIMEOUT = 180  # seconds per request, unless the config says otherwise
+WINDOW = 20  # recent calls per model kept for latency/error statistics
+FAILURE_THRESHOLD = 3  # consecutive failures that open a model's circuit
+MAX_ERROR_RATE = 0.5  # error rate over the window that opens it, once MIN_CALLS calls are in
+MIN_CALLS = 6
+COOLDOWN = 30  # seconds before an open circuit lets a probe through; doubles per failed probe
+MAX_COOLDOWN = 600
+
+
+class ModelRegistry:
+    """The arena's models, their endpoints and timeouts, and whether they currently respond.
+
+    Every API call is recorded with its latency and outcome in a rolling window.
+    A model whose circuit is closed takes part in matchmaking. After
+    FAILURE_THRESHOLD failures in a row, an error rate of MAX_ERROR_RATE over
+    the window, or a median latency above its optional `slow_after`, the
+    circuit opens and the model is left out. Once its cooldown has passed the
+    circuit is half-open: the model gets one small probe request (see `start`),
+    which closes the circuit on success and reopens it, with twice the
+    cooldown, on failure. Only the probe decides: results of ordinary calls are
+    ignored unless the circuit is closed and the call started after it last
+    closed. Thread-safe.
+    """
+
+    def __init__(self, models, window=WINDOW, failure_threshold=FAILURE_THRESHOLD, max_error_rate=MAX_ERROR_RATE,
+                 min_calls=MIN_CALLS, cooldown=COOLDOWN, max_cooldown=MAX_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.max_error_rate = max_error_rate
+        self.min_calls = min_calls
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.models = {}
+        for model in models:
+            model = {'name': model} if isinstance(model, str) else dict(model)
+            model.setdefault('endpoint', 'default')
+            model.setdefault('timeout', DEFAULT_TIMEOUT)
+            model.setdefault('slow_after', None)
+            model.update(calls=deque(maxlen=window), state='closed', failures=0, opened_at=0.0, closed_at=0.0,
+                         cooldown=cooldown)
+            self.models[model['name']] = model
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+
+    @classmethod
+    def from_config(cls, path=MODELS_FILE, **kwargs):
+        """Loads {"defaults": {...}, "models": [name or {name, endpoint, timeout, slow_after}, ...]}."""
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        defaults = config.get('defaults', {})
+        models = [dict(defaults, **({'name': m} if isinstance(m, str) else m)) for m in config['models']]
+        return cls(models, **kwargs)
+
+    def names(self):
+        return list(self.models)
+
+    def endpoint(self, name):
+        return self.models[name]['endpoint']
+
+    def timeout(self, name):
+        return self.models[name]['timeout']
+
+    def available(self):
+        """Models whose circuit is closed, i.e. the only ones battles may be built from."""
+        with self._lock:
+            return [name for name, model in self.models.items() if model['state'] == 'closed']
+
+    def _open(self, model, reason):
+        if model['state'] == 'half_open':
+            model['cooldown'] = min(model['cooldown'] * 2, self.max_cooldown)
+        model['state'] = 'open'
+        model['opened_at'] = time.monotonic()
+        print(f"❌ Model '{model['name']}' taken out of matchmaking ({reason}); probing again in {model['cooldown']:.0f}s.")
+
+    def record(self, name, latency, ok, started=None, probe=False):
+        """Adds one call's outcome (latency may be None for failures); may open or close the model's circuit.
+
+        `started` is the call's time.monotonic() start, defaulting to now. A
+        probe result settles a half-open circuit; any other result only counts
+        while the circuit is closed and if the call started after it closed.
+        """
+        started = time.monotonic() if started is None else started
+        with self._lock:
+            model = self.models.get(name)
+            if model is None:
+                return
+            if probe:
+                if model['state'] != 'half_open':
+                    return
+                if ok:
+                    model['state'] = 'closed'
+                    model['closed_at'] = time.monotonic()
+                    model['failures'] = 0
+                    model['cooldown'] = self.base_cooldown
+                    model['calls'].clear()
+                    print(f"✅ Model '{name}' responded to a probe; back in matchmaking.")
+                else:
+                    self._open(model, "probe failed")
+                return
+            if model['state'] != 'closed' or started < model['closed_at']:
+                return
+            model['calls'].append((latency, ok))
+            model['failures'] = 0 if ok else model['failures'] + 1
+            reason = self._unhealthy(model)
+            if reason:
+                self._open(model, reason)
+
+    def _unhealthy(self, model):
+        calls = model['calls']
+        if model['failures'] >= self.failure_threshold:
+            return f"{model['failures']} failures in a row"
+        if len(calls) >= self.min_calls:
+            error_rate = sum(not ok for _, ok in calls) / len(calls)
+            if error_rate >= self.max_error_rate:
+                return f"error rate {error_rate:.0%}"
+            latencies = [latency for latency, ok in calls if ok]
+            median = statistics.median(latencies) if latencies else None
+            if model['slow_after'] is not None and median is not None and median > model['slow_after']:
+                return f"median latency {median:.0f}s"
+        return None
+
+    def due_probes(self):
+        """Open circuits whose cooldown has passed; they turn half-open and await one probe."""
+        now = time.monotonic()
+        with self._lock:
+            due = [model for model in self.models.values()
+                   if model['state'] == 'open' and now - model['opened_at'] >= model['cooldown']]
+            for model in due:
+                model['state'] = 'half_open'
+            return [model['name'] for model in due]
+
+    def stats(self):
+        """Per model: state, recent calls, error rate and median/max latency of successful calls in seconds."""
+        with self._lock:
+            rows = []
+            for name, model in self.models.items():
+                calls = model['calls']
+                latencies = [latency for latency, ok in calls if ok]
+                rows.append({
+                    'model': name,
+                    'state': model['state'],
+                    'calls': len(calls),
+                    'error_rate': sum(not ok for _, ok in calls) / len(calls) if calls else None,
+                    'median_latency': statistics.median(latencies) if latencies else None,
+                    'max_latency': max(latencies) if latencies else None,
+                })
+            return rows
+
+    def start(self, probe, interval=5):
+        """Background thread that calls `probe(name)` for every due model; success is not raising."""
+        def loop():
+            while not self._stopped.wait(interval):
+                for name in self.due_probes():
+                    start = time.monotonic()
+                    try:
+                        probe(name)
+                        ok = True
+                    except Exception:
+                        ok = False
+                    self.record(name, time.monotonic() - start, ok, started=start, probe=True)
+
+        self._thread = threading.Thread(target=loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and list a model registry config.")
+    parser.add_argument('--config', type=str, default=MODELS_FILE)
+    args = parser.parse_args()
+
+    registry = ModelRegistry.from_config(args.config)
+    for name in registry.names():
+        model = registry.models[name]
+        slow = f", slow after {model['slow_after']}s" if model['slow_after'] is not None else ""
+        print(f"{name:<40} | {model['endpoint']:<8} | timeout {model['timeout']}s{slow}")
+    print(f"✅ {len(registry.names())} models in '{args.config}'.")
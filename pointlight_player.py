@@ -0,0 +1,141 @@
+import base64
+import zlib
+
+import gradio as gr
+import numpy as np
+
+# --- Configuration ---
+LEVELS = 4095  # positions are quantized to 12 bits of the trajectory's bounding box
+HIDDEN = -1  # quantized value of a point that is not drawn in a frame
+
+
+def encode_trajectory(points, coords='data', fps=30, limits=None):
+    """Packs a (frames, points, 2) trajectory into a JSON-ready dict of a few kilobytes.
+
+    Positions are flipped to screen orientation (y down), scaled uniformly so
+    the longer side of the frame spans LEVELS, and rounded; NaN points become
+    HIDDEN. The frame is `limits` (x_min, x_max, y_min, y_max of the script's
+    axes or display, as recorded by the tracer) when given, so every clip keeps
+    its script's framing and scale and points outside it are hidden; otherwise
+    it is the bounding box of the trajectory over all frames. The int16 values
+    are stored per coordinate and point as frame-to-frame deltas, which deflate
+    well because point-lights move smoothly, and sent base64-encoded. Returns
+    None if the trajectory has no visible point.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if points.ndim != 3 or points.shape[1] == 0 or not np.isfinite(points).any():
+        return None
+    visible = np.isfinite(points).all(axis=-1)
+    if limits is not None and np.isfinite(limits).all() and limits[0] != limits[1] and limits[2] != limits[3]:
+        x0, x1, y0, y1 = limits
+        if coords == 'data':  # y points up, so the top limit is the first screen row
+            y0, y1 = y1, y0
+        lo, extent = np.array([x0, y0]), np.array([x1 - x0, y1 - y0])  # negative for inverted axes
+    else:
+        if coords == 'data':
+            points = points * [1, -1]
+        lo = np.nanmin(points[visible], axis=0)
+        extent = np.nanmax(points[visible], axis=0) - lo
+    scale = LEVELS / max(np.abs(extent).max(), 1e-9)
+    size = np.round(np.abs(extent) * scale)
+    scaled = np.round((points - lo) * scale * np.where(extent < 0, -1, 1))
+    visible &= ((scaled >= 0) & (scaled <= size)).all(axis=-1)
+    if not visible.any():
+        return None
+    quantized = np.where(visible[..., None], scaled, HIDDEN).astype(np.int32)
+    planar = quantized.transpose(2, 1, 0)  # (xy, points, frames)
+    deltas = np.concatenate([planar[..., :1], np.diff(planar, axis=-1)], axis=-1).astype('<i2')
+    return {
+        'fps': fps,
+        'frames': int(points.shape[0]),
+        'points': int(points.shape[1]),
+        'width': int(size[0]),
+        'height': int(size[1]),
+        'data': base64.b64encode(zlib.compress(deltas.tobytes(), 9)).decode('ascii'),
+    }
+
+
+def decode_trajectory(payload):
+    """Inverse of encode_trajectory: (frames, points, 2) float32 in quantized screen units, NaN where hidden."""
+    deltas = np.frombuffer(zlib.decompress(base64.b64decode(payload['data'])), dtype='<i2')
+    planar = np.cumsum(deltas.reshape(2, payload['points'], payload['frames']).astype(np.int32), axis=-1)
+    quantized = planar.transpose(2, 1, 0)
+    return np.where(quantized == HIDDEN, np.nan, quantized).astype(np.float32)
+
+
+PLAYER_HTML = '<canvas class="pointlight"></canvas>'
+
+PLAYER_CSS = 'canvas { display: block; width: 100%; aspect-ratio: 4 / 3; background: #000; border-radius: 6px; }'
+
+# Mirrors decode_trajectory, then draws on every animation frame. All players on
+# the page share one epoch and requestAnimationFrame hands every callback of a
+# display frame the same timestamp, so A and B always show the same frame index.
+PLAYER_JS = """
+window.biomotionEpoch = window.biomotionEpoch || performance.now();
+let trajectory = null;
+let loads = 0;
+
+async function load(payload) {
+    const token = ++loads;
+    if (!payload || !payload.data) { trajectory = null; return; }
+    const bytes = Uint8Array.from(atob(payload.data), c => c.charCodeAt(0));
+    const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('deflate'));
+    const view = new DataView(await new Response(stream).arrayBuffer());
+    const F = payload.frames, P = payload.points;
+    const q = new Int16Array(F * P * 2);  // [frame][point][xy]
+    for (let axis = 0; axis < 2; axis++) {
+        for (let p = 0; p < P; p++) {
+            let value = 0;
+            for (let f = 0; f < F; f++) {
+                value += view.getInt16(2 * ((axis * P + p) * F + f), true);
+                q[(f * P + p) * 2 + axis] = value;
+            }
+        }
+    }
+    if (token === loads) trajectory = Object.assign({}, payload, {q: q});
+}
+
+function draw(now) {
+    if (!element.isConnected) return;
+    const canvas = element.querySelector('canvas');
+    if (canvas) {
+        const ratio = window.devicePixelRatio || 1;
+        const W = Math.round(canvas.clientWidth * ratio), H = Math.round(canvas.clientHeight * ratio);
+        if (canvas.width !== W || canvas.height !== H) { canvas.width = W; canvas.height = H; }
+        const ctx = canvas.getContext('2d');
+        ctx.fillStyle = '#000';
+        ctx.fillRect(0, 0, W, H);
+        const t = trajectory;
+        if (t && t.frames > 0) {
+            const frame = Math.floor((now - window.biomotionEpoch) * t.fps / 1000) % t.frames;
+            const margin = 0.08 * Math.min(W, H);
+            const scale = Math.min((W - 2 * margin) / Math.max(t.width, 1), (H - 2 * margin) / Math.max(t.height, 1));
+            const x0 = (W - t.width * scale) / 2, y0 = (H - t.height * scale) / 2;
+            const radius = Math.max(2, 0.012 * Math.min(W, H));
+            ctx.fillStyle = '#fff';
+            for (let p = 0; p < t.points; p++) {
+                const i = (frame * t.points + p) * 2;
+                if (t.q[i] === -1) continue;
+                ctx.beginPath();
+                ctx.arc(x0 + t.q[i] * scale, y0 + t.q[i + 1] * scale, radius, 0, 2 * Math.PI);
+                ctx.fill();
+            }
+        }
+    }
+    requestAnimationFrame(draw);
+}
+
+load(props.value);
+watch('value', () => load(props.value));
+requestAnimationFrame(draw);
+"""
+
+
+class PointLightPlayer(gr.HTML):
+    """Plays an encode_trajectory payload on a canvas in the browser, at the display's frame rate."""
+
+    def __init__(self, value=None, **kwargs):
+        super().__init__(value, html_template=PLAYER_HTML, css_template=PLAYER_CSS, js_on_load=PLAYER_JS, **kwargs)
+
+    def api_info(self):
+        return {"type": "object"}
@@ -0,0 +1,132 @@
+import argparse
+import csv
+import os
+import sqlite3
+import threading
+import time
+
+# --- Configuration ---
+PREFERENCES_DB = 'preferences.db'
+CSV_HEADER = ["battle_id", "model_a", "model_b", "preference"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS preferences (
+    battle_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    model_a TEXT NOT NULL,
+    model_b TEXT NOT NULL,
+    preference TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS preferences_model_pair ON preferences (model_a, model_b);
+"""
+
+
+class PreferenceStore:
+    """Arena votes in SQLite (WAL mode) instead of an append-only CSV.
+
+    Battle ids come from AUTOINCREMENT, so they are unique even with many
+    Gradio users voting at once, and adding a vote never reads earlier ones.
+    Inserts are committed in batches: once `batch_size` votes are pending or
+    `flush_interval` seconds after the first pending one, whichever is first.
+    A crash can lose at most that window. `export_csv` writes the
+    battle_id, model_a, model_b, preference layout of preferences.csv.
+    """
+
+    def __init__(self, path=PREFERENCES_DB, batch_size=32, flush_interval=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._timer = None
+
+    def add(self, model_a, model_b, preference):
+        """Stores one vote and returns its battle id."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO preferences (model_a, model_b, preference, created_at) VALUES (?, ?, ?, ?)",
+                (model_a, model_b, preference, time.time()))
+            self._pending += 1
+            if self._pending >= self.batch_size:
+                self._commit()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+            return cursor.lastrowid
+
+    def _commit(self):
+        self._conn.commit()
+        self._pending = 0
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def flush(self):
+        with self._lock:
+            self._commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM preferences").fetchone()[0]
+
+    def votes(self):
+        """(battle_id, model_a, model_b, preference) rows in battle order."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT battle_id, model_a, model_b, preference FROM preferences ORDER BY battle_id").fetchall()
+
+    def pair_votes(self, model_a, model_b):
+        """Votes between two models in either order, using the model-pair index."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT battle_id, model_a, model_b, preference FROM preferences "
+                "WHERE (model_a = ? AND model_b = ?) OR (model_a = ? AND model_b = ?) ORDER BY battle_id",
+                (model_a, model_b, model_b, model_a)).fetchall()
+
+    def import_csv(self, csv_path):
+        """Copies a preferences.csv into the store, keeping its battle ids; returns the count."""
+        with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+            rows = [(int(row['battle_id']), row['model_a'], row['model_b'], row['preference'], time.time())
+                    for row in csv.DictReader(f)]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO preferences (battle_id, model_a, model_b, preference, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows)
+            self._commit()
+        return len(rows)
+
+    def export_csv(self, csv_path):
+        """Writes all committed and pending votes in the preferences.csv layout."""
+        rows = self.votes()
+        tmp_path = csv_path + '.tmp'
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_HEADER)
+            writer.writerows(rows)
+        os.replace(tmp_path, csv_path)
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self._commit()
+            self._conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import or export the arena's SQLite preference store.")
+    parser.add_argument('command', choices=['import', 'export'])
+    parser.add_argument('--db', type=str, default=PREFERENCES_DB)
+    parser.add_argument('--csv', type=str, default='preferences.csv')
+    args = parser.parse_args()
+
+    store = PreferenceStore(args.db)
+    if args.command == 'import':
+        print(f"✅ Imported {store.import_csv(args.csv)} votes from '{args.csv}' into '{args.db}'.")
+    else:
+        print(f"✅ Exported {store.export_csv(args.csv)} votes from '{args.db}' to '{args.csv}'.")
+    store.close()
@@ -0,0 +1,126 @@
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from tqdm import tqdm
+
+from headless_render import render_script
+
+# --- Configuration ---
+CORPUS_DIRS = ['Examples/LLMs', 'Examples/MLLMs', 'Examples/code-specific']
+RENDER_CACHE_DIR = 'render_cache'
+INDEX_FILE = 'index.json'
+
+
+def script_hash(script_path):
+    with open(script_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def clip_path(digest, cache_dir=RENDER_CACHE_DIR, ext='.mp4'):
+    return os.path.join(cache_dir, digest[:2], digest + ext)
+
+
+def cached_clip(script_path, cache_dir=RENDER_CACHE_DIR, ext='.mp4'):
+    """Pre-rendered clip of a script, or None. Keyed by content, so edited scripts miss."""
+    path = clip_path(script_hash(script_path), cache_dir, ext)
+    return path if os.path.exists(path) else None
+
+
+def find_scripts(corpus_dirs=CORPUS_DIRS):
+    scripts = []
+    for corpus_dir in corpus_dirs:
+        for root, _, files in os.walk(corpus_dir):
+            scripts.extend(os.path.join(root, f) for f in files if f.endswith('.py'))
+    return sorted(scripts)
+
+
+def load_index(cache_dir=RENDER_CACHE_DIR):
+    path = os.path.join(cache_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_index(index, cache_dir=RENDER_CACHE_DIR):
+    path = os.path.join(cache_dir, INDEX_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _render_one(script_path, digest, cache_dir, ext, n_frames, fps, timeout):
+    target = clip_path(digest, cache_dir, ext)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    # unique per job, so a retried or concurrent render never shares the encoder's output file
+    fd, tmp_target = tempfile.mkstemp(prefix=digest[:16] + '.', suffix='.part' + ext, dir=os.path.dirname(target))
+    os.close(fd)
+    try:
+        render_script(script_path, tmp_target, n_frames=n_frames, fps=fps, timeout=timeout)
+        os.replace(tmp_target, target)
+        return {'hash': digest, 'status': 'ok', 'clip': os.path.relpath(target, cache_dir)}
+    except Exception as e:
+        if os.path.exists(tmp_target):
+            os.remove(tmp_target)
+        message = str(e).strip().splitlines()[-1] if str(e).strip() else type(e).__name__
+        return {'hash': digest, 'status': 'failed', 'error': message[:500]}
+
+
+def prerender(corpus_dirs=CORPUS_DIRS, cache_dir=RENDER_CACHE_DIR, ext='.mp4', n_frames=150, fps=30, timeout=120, workers=None, retry_failed=False):
+    """Renders every corpus script whose content hash is not cached yet.
+
+    Each render runs in its own child process; `workers` (default: one per CPU
+    core) of them run at a time. Identical copies of a script are rendered once
+    and every copy's path is recorded against the clip.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    index = load_index(cache_dir)
+    failed_hashes = {entry['hash'] for entry in index.values() if entry['status'] == 'failed'}
+
+    jobs = {}  # digest -> every script path with that content
+    for script_path in find_scripts(corpus_dirs):
+        digest = script_hash(script_path)
+        if os.path.exists(clip_path(digest, cache_dir, ext)):
+            index[script_path] = {'hash': digest, 'status': 'ok', 'clip': os.path.relpath(clip_path(digest, cache_dir, ext), cache_dir)}
+            continue
+        if digest in failed_hashes and not retry_failed:
+            continue
+        jobs.setdefault(digest, []).append(script_path)
+
+    print(f"{sum(map(len, jobs.values()))} scripts ({len(jobs)} distinct) to render, the rest are cached.")
+    workers = workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_render_one, script_paths[0], digest, cache_dir, ext, n_frames, fps, timeout): script_paths
+            for digest, script_paths in jobs.items()
+        }
+        for done, future in enumerate(tqdm(as_completed(futures), total=len(futures)), 1):
+            for script_path in futures[future]:
+                index[script_path] = future.result()
+            if done % 100 == 0:
+                save_index(index, cache_dir)
+    save_index(index, cache_dir)
+
+    ok = sum(1 for entry in index.values() if entry['status'] == 'ok')
+    print(f"✅ {ok}/{len(index)} scripts have a cached clip in '{cache_dir}'.")
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-render the Examples corpus into a content-addressed clip cache.")
+    parser.add_argument('--corpus', nargs='+', default=CORPUS_DIRS, help='Directories searched for scripts.')
+    parser.add_argument('--cache-dir', type=str, default=RENDER_CACHE_DIR)
+    parser.add_argument('--format', type=str, default='mp4', choices=['mp4', 'webm', 'gif', 'npy'])
+    parser.add_argument('--frames', type=int, default=150, help='Frames captured per script.')
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--timeout', type=int, default=120, help='Seconds before a script is given up on.')
+    parser.add_argument('--workers', type=int, default=None, help='Parallel renders; defaults to the number of CPU cores.')
+    parser.add_argument('--retry-failed', action='store_true', help='Render scripts that failed in a previous run again.')
+    args = parser.parse_args()
+
+    prerender(args.corpus, args.cache_dir, '.' + args.format, args.frames, args.fps, args.timeout, args.workers, args.retry_failed)
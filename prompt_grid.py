@@ -0,0 +1,136 @@
+import os
+import re
+from collections import namedtuple
+
+# --- Motion space shared by the generation drivers ---
+
+action_list = ['walking', 'running', 'waving a hand', 'jumping up', 'jumping forward', 'bowing', 'lying down', 'sitting down', 'turning around', 'forward rolling']
+
+gender_list = ['man', 'woman']
+
+happiness_list = ['happy', 'sad']
+
+weight_list = ['heavy', 'light']
+
+SYSTEM_PROMPT = "You are an expert Python programmer. You will be given a question (problem specification) and will generate a correct Python program that matches the specification. You will NOT return anything except for the program."
+
+SYSTEM_PROMPT_MLLM = "You are an expert Python programmer. You will be given a question (problem specification) and will generate a correct Python program that matches the specification and passes all tests. You will NOT return anything except for the program."
+
+# One cell of the prompt grid. `point` and `sample` are only set for the
+# repeated "point" variants produced by openai-MLLM.py.
+PromptCell = namedtuple('PromptCell', ['variant', 'action', 'gender', 'weight', 'happiness', 'point', 'sample', 'prompt'])
+
+
+def build_prompt(action, gender=None, happiness=None, weight=None, point='15', with_image=False):
+    """Builds the user prompt for a basic (no attributes) or fine-grained cell."""
+    if with_image:
+        Question = "Question: Given an example image <image>, write a Python program that shows a point-light stimulus animation which represents biological motion. \n Detailed Requirements: \n "
+    else:
+        Question = "Question: write a Python program that shows a point-light stimulus animation which represents biological motion. \n Detailed Requirements: \n "
+
+    if gender is None:
+        prompt_action = "1. Subject and Action: The animation depict a man is <" + action + ">. \n"
+    else:
+        prompt_action = "1. Subject and Action: The animation depict a " + happiness + " " + gender + " with " + weight + " weight is <" + action + ">. \n"
+
+    prompt_style_quality = "2. Visual Style: The stimulus should consist of exactly " + point + " white point-lights moving against a solid black background. \n 3. Motion Quality: The animation must be realistic, coherent, and biomechanically plausible to accurately represent the specified human action. The movement should be smooth and natural. "
+    if with_image:
+        prompt_style_quality += "The style should be the same as the example image. "
+    prompt_style_quality += "\n"
+
+    return Question + prompt_action + prompt_style_quality
+
+
+def basic_cells(actions=None, points=None, samples=1, with_image=False):
+    actions = action_list if actions is None else actions
+    cells = []
+    for sample in range(samples):
+        for action in actions:
+            if points is None:
+                cells.append(PromptCell('basic', action, None, None, None, None, None if samples == 1 else sample,
+                                        build_prompt(action, with_image=with_image)))
+                continue
+            for point in points:
+                cells.append(PromptCell('basic', action, None, None, None, point, sample,
+                                        build_prompt(action, point=point, with_image=with_image)))
+    return cells
+
+
+def fine_cells(actions=None, with_image=False):
+    actions = action_list if actions is None else actions
+    cells = []
+    for action in actions:
+        for gender in gender_list:
+            for happiness in happiness_list:
+                for weight in weight_list:
+                    cells.append(PromptCell('fine', action, gender, weight, happiness, None, None,
+                                            build_prompt(action, gender, happiness, weight, with_image=with_image)))
+    return cells
+
+
+def cell_path(name_tail, cell, root='.'):
+    """Output file for a cell, using the Examples/<model>/py_code[_fine] naming."""
+    if cell.variant == 'fine':
+        file_name = name_tail + "_" + cell.gender + "_" + cell.weight + "_" + cell.happiness + "_" + cell.action + ".py"
+        return os.path.join(root, name_tail, "py_code_fine", file_name)
+    if cell.point is not None:
+        file_name = name_tail + "_" + cell.action + "_point_" + cell.point + "-" + str(cell.sample) + ".py"
+    elif cell.sample is not None:
+        file_name = name_tail + "_" + cell.action + "-" + str(cell.sample) + ".py"
+    else:
+        file_name = name_tail + "_" + cell.action + ".py"
+    return os.path.join(root, name_tail, "py_code", file_name)
+
+
+def extract_python_code(content):
+    match = re.search(r'```python(.*?)```', content, re.DOTALL)
+    if match: return match.group(1).strip()
+    return content.strip()
+
+
+def save_code(file_path, code):
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w') as f:
+            f.write(code)
+        print(f"✅ Successfully created and saved to '{file_path}'")
+        return True
+    except Exception as e:
+        print(f"❌ An error occurred: {e}")
+        return False
+
+
+def parse_script_name(file_name):
+    """Recovers the prompt cell from a generated script's file name.
+
+    Understands `<tail>_<action>.py`, `<tail>_<action>-<sample>.py`,
+    `<tail>_<action>_point_<n>-<sample>.py` and
+    `<tail>_<gender>_<weight>_<happiness>_<action>.py`.
+    Unknown attributes are None.
+    """
+    name = os.path.basename(file_name)
+    if name.endswith('.py'):
+        name = name[:-3]
+    info = {'model': None, 'variant': 'basic', 'action': None, 'gender': None, 'weight': None,
+            'happiness': None, 'point': None, 'sample': None}
+    if '_' not in name:
+        info['action'] = name
+        return info
+    info['model'], rest = name.split('_', 1)
+
+    match = re.fullmatch(r'(.+)_point_(\d+)-(\d+)', rest)
+    if match:
+        info['action'], info['point'], info['sample'] = match.group(1), match.group(2), int(match.group(3))
+        return info
+
+    tokens = rest.split('_')
+    if len(tokens) >= 4 and tokens[0] in gender_list:
+        info['variant'] = 'fine'
+        info['gender'], info['weight'], info['happiness'] = tokens[:3]
+        rest = '_'.join(tokens[3:])
+
+    match = re.fullmatch(r'(.+)-(\d+)', rest)
+    if match:
+        rest, info['sample'] = match.group(1), int(match.group(2))
+    info['action'] = rest
+    return info
@@ -2,129 +2,73 @@ import os
 os.environ['CUDA_VISIBLE_DEVICES'] = '0,1'
 
 access_token = 'xxxxxx'
+import argparse
 import subprocess
 import re
-from tqdm import tqdm
 from transformers import AutoModelForCausalLM, AutoTokenizer
 
+from local_generation import generate_batched
+from prompt_grid import SYSTEM_PROMPT_MLLM, basic_cells, cell_path, fine_cells, save_code
+from run_manifest import RunManifest, prompt_hash
 
-model_name = "Qwen/Qwen2.5-72B-Instruct"
 
-name_tail = "qwen25-72b"
+parser = argparse.ArgumentParser(description="Generate the BioMotion prompt grid with a local Hugging Face model.")
+parser.add_argument('--model', type=str, default="Qwen/Qwen2.5-72B-Instruct", help='Model name or local path.')
+parser.add_argument('--name-tail', type=str, default="qwen25-72b", help='Output directory and file prefix.')
+parser.add_argument('--batch-size', type=int, default=8, help='Prompts decoded together in one generate() call.')
+parser.add_argument('--max-new-tokens', type=int, default=32768)
+parser.add_argument('--no-prefix-cache', action='store_true', help='Prefill the shared prompt prefix for every batch instead of once.')
+parser.add_argument('--device-map', type=str, default="auto", help="e.g. 'auto' or 'cpu'.")
+args = parser.parse_args()
+
+model_name = args.model
+
+name_tail = args.name_tail
 
 model = AutoModelForCausalLM.from_pretrained(
     model_name,
     torch_dtype="auto",
-    device_map="auto"
+    device_map=args.device_map
 )
 
 tokenizer = AutoTokenizer.from_pretrained(model_name)
 
-# fine-grained
-
-action_list = ['walking', 'running', 'waving a hand', 'jumping up', 'jumping forward', 'bowing', 'lying down', 'sitting down', 'turning around', 'forward rolling']
-
-gender_list = ['man','woman']
-
-happiness_list = ['happy','sad']
-
-weight_list = ['heavy', 'light']
-
-for action in tqdm(action_list): 
-    for gender in gender_list:
-        for happiness in happiness_list:
-            for weight in weight_list:
-
-                Question = "Question: write a Python program that shows a point-light stimulus animation which represents biological motion. \n Detailed Requirements: \n "
-
-                prompt_action = "1. Subject and Action: The animation depict a "+ happiness + gender + " with " + weight +" weight is <" + action + ">. \n"
-
-                prompt_style_quality = "2. Visual Style: The stimulus should consist of exactly 15 white point-lights moving against a solid black background. \n 3. Motion Quality: The animation must be realistic, coherent, and biomechanically plausible to accurately represent the specified human action. The movement should be smooth and natural. \n"
-
-                prompt = Question +prompt_action +prompt_style_quality
-
-
-                messages = [
-                    {"role": "system", "content": "You are an expert Python programmer. You will be given a question (problem specification) and will generate a correct Python program that matches the specification and passes all tests. You will NOT return anything except for the program."},
-                    {"role": "user", "content": prompt}
-                ]
-
-
+# completed cells are recorded here; rerunning the script only generates missing or failed ones
+manifest = RunManifest('generation_manifest.jsonl')
 
-                text = tokenizer.apply_chat_template(
-                    messages,
-                    tokenize=False,
-                    add_generation_prompt=True
-                )
-                model_inputs = tokenizer([text], return_tensors="pt").to(model.device)
+# fine-grained version first, then basic
+cells = fine_cells() + basic_cells()
 
-                generated_ids = model.generate(
-                    **model_inputs,
-                    max_new_tokens=32768
-                )
-                generated_ids = [
-                    output_ids[len(input_ids):] for input_ids, output_ids in zip(model_inputs.input_ids, generated_ids)
-                ]
+pending = {}
+for cell in cells:
+    cell_hash = prompt_hash(SYSTEM_PROMPT_MLLM, cell.prompt)
+    if not manifest.is_done(model_name, cell_hash, cell.sample):
+        pending[cell_hash, cell.sample] = cell
 
-                response = tokenizer.batch_decode(generated_ids, skip_special_tokens=True)[0]
 
-                match = re.search(r'```python(.*?)```', response, re.DOTALL)
-                if match:
-                    code = match.group(1)
-
-                file_path = "./"+name_tail+"/py_code_fine/"+name_tail+"_"+gender+"_"+weight+"_"+happiness+"_"+action+".py"
-
-                try:
-                    with open(file_path, 'w') as f:
-                        f.write(code)
-                    print(f"✅ Successfully created and saved to '{file_path}'")
-                except Exception as e:
-                    print(f"❌ An error occurred: {e}")
-
-
-
-
-# basic version
-for action in tqdm(action_list): 
-    Question = "Question: write a Python program that shows a point-light stimulus animation which represents biological motion. \n Detailed Requirements: \n "
-
-    prompt_action = "1. Subject and Action: The animation depict a man is " + action + ">. \n"
-
-    prompt_style_quality = "2. Visual Style: The stimulus should consist of exactly 15 white point-lights moving against a solid black background. \n 3. Motion Quality: The animation must be realistic, coherent, and biomechanically plausible to accurately represent the specified human action. The movement should be smooth and natural. \n"
-
-    prompt = Question + prompt_action +prompt_style_quality
-    messages = [
-        {"role": "system", "content": "You are an expert Python programmer. You will be given a question ( problem specification) and will generate a correct Python program that matches the specification and passes all tests. You will NOT return anything except for the program."},
-        {"role": "user", "content": prompt}
-    ]
-    
-
-    text = tokenizer.apply_chat_template(
-        messages,
-        tokenize=False,
-        add_generation_prompt=True
-    )
-    model_inputs = tokenizer([text], return_tensors="pt").to(model.device)
-
-    generated_ids = model.generate(
-        **model_inputs,
-        max_new_tokens=32768
-    )
-    generated_ids = [
-        output_ids[len(input_ids):] for input_ids, output_ids in zip(model_inputs.input_ids, generated_ids)
-    ]
-
-    response = tokenizer.batch_decode(generated_ids, skip_special_tokens=True)[0]
+def write_output(key, response):
+    cell_hash, sample = key
+    cell = pending[key]
+    file_path = cell_path(name_tail, cell)
 
     match = re.search(r'```python(.*?)```', response, re.DOTALL)
-    if match:
-        code = match.group(1)
-
-    file_path = "./"+name_tail+"/py_code/"+name_tail+"_"+action+".py"
-
-    try:
-        with open(file_path, 'w') as f:
-            f.write(code)
-        print(f"✅ Successfully created and saved to '{file_path}'")
-    except Exception as e:
-        print(f"❌ An error occurred: {e}")
+    if not match:
+        print(f"❌ No python code block in the response for '{file_path}'")
+        manifest.record(model_name, cell_hash, sample, file_path, False, error="no python code block")
+        return
+
+    ok = save_code(file_path, match.group(1))
+    manifest.record(model_name, cell_hash, sample, file_path, ok, error=None if ok else "write failed")
+
+
+print(f"{len(cells) - len(pending)} cells already done, generating {len(pending)}.")
+generate_batched(
+    model,
+    tokenizer,
+    [(key, cell.prompt) for key, cell in pending.items()],
+    SYSTEM_PROMPT_MLLM,
+    write_output,
+    batch_size=args.batch_size,
+    max_new_tokens=args.max_new_tokens,
+    reuse_prefix=not args.no_prefix_cache
+)
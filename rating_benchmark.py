@@ -0,0 +1,132 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from elo_score import (INITIAL_ELO, K_FACTOR, bootstrap_bradley_terry, bootstrap_elo, bradley_terry_ratings,
+                       elo_ratings, numba, pairwise_counts, stream_votes, synthetic_votes, votes_from_frame)
+
+# --- Configuration ---
+RESULTS_FILE = 'benchmark_results.json'
+MODES = ['elo', 'bt', 'stream', 'bootstrap_elo', 'bootstrap_bt']
+
+
+def _ranks(values):
+    return np.argsort(np.argsort(values)).astype(np.float64)
+
+
+def spearman(a, b):
+    return float(np.corrcoef(_ranks(a), _ranks(b))[0, 1])
+
+
+def kendall_tau(a, b):
+    a, b = np.asarray(a), np.asarray(b)
+    concordance = np.sign(a[:, None] - a[None, :]) * np.sign(b[:, None] - b[None, :])
+    n = len(a)
+    return float(concordance.sum() / (n * (n - 1))) if n > 1 else 1.0
+
+
+def _run_mode(mode, df, models, left, right, score, bootstrap_rounds):
+    n_models = len(models)
+    if mode == 'elo':
+        return elo_ratings(left, right, score, n_models, K_FACTOR, INITIAL_ELO)
+    if mode == 'bt':
+        return bradley_terry_ratings(pairwise_counts(left, right, score, n_models), INITIAL_ELO)
+    if mode == 'bootstrap_elo':
+        return bootstrap_elo(left, right, score, n_models, bootstrap_rounds, K_FACTOR, INITIAL_ELO).mean(axis=0)
+    if mode == 'bootstrap_bt':
+        return bootstrap_bradley_terry(left, right, score, n_models, bootstrap_rounds, INITIAL_ELO).mean(axis=0)
+    if mode == 'stream':
+        # includes parsing the CSV, as a real streaming run would
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'votes.csv')
+            df.to_csv(path, index=False)
+            start = time.perf_counter()
+            state = stream_votes(path, K_FACTOR, INITIAL_ELO)
+            seconds = time.perf_counter() - start
+        by_name = dict(zip(state.models, state.ratings))
+        return np.array([by_name[m] for m in models]), seconds
+    raise ValueError(f"Unknown mode '{mode}'.")
+
+
+def run_scenario(n_models, n_votes, tie_rate, both_bad_rate, skew, modes=MODES, bootstrap_rounds=100, seed=0):
+    df, truth = synthetic_votes(n_votes, n_models, tie_rate, both_bad_rate, skew, seed=seed)
+    start = time.perf_counter()
+    models, left, right, score = votes_from_frame(df)
+    encode_seconds = time.perf_counter() - start
+    true_strength = np.array([truth[m] for m in models])
+
+    results = {}
+    for mode in modes:
+        start = time.perf_counter()
+        ratings = _run_mode(mode, df, models, left, right, score, bootstrap_rounds)
+        seconds = time.perf_counter() - start
+        if isinstance(ratings, tuple):
+            ratings, seconds = ratings
+        results[mode] = {
+            'seconds': seconds,
+            'votes_per_second': n_votes / seconds if seconds else None,
+            'spearman': spearman(ratings, true_strength),
+            'kendall_tau': kendall_tau(ratings, true_strength),
+        }
+    return {
+        'n_models': n_models,
+        'n_votes': n_votes,
+        'tie_rate': tie_rate,
+        'both_bad_rate': both_bad_rate,
+        'skew': skew,
+        'seed': seed,
+        'models_seen': len(models),
+        'encode_seconds': encode_seconds,
+        'results': results,
+    }
+
+
+def run_benchmark(model_counts, vote_counts, tie_rates, both_bad_rates, skews, modes=MODES, bootstrap_rounds=100, seed=0, out_path=RESULTS_FILE):
+    """Runs every combination of the scenario parameters and writes the results as JSON."""
+    scenarios = []
+    for n_models, n_votes, tie_rate, both_bad_rate, skew in itertools.product(model_counts, vote_counts, tie_rates, both_bad_rates, skews):
+        scenario = run_scenario(n_models, n_votes, tie_rate, both_bad_rate, skew, modes, bootstrap_rounds, seed)
+        scenarios.append(scenario)
+        print(f"--- {n_models} models, {n_votes:,} votes, tie={tie_rate}, both_bad={both_bad_rate}, skew={skew} ---")
+        for mode, result in scenario['results'].items():
+            print(f"{mode:<15} | {result['seconds']:8.3f}s | Spearman: {result['spearman']:.3f} | Kendall: {result['kendall_tau']:.3f}")
+
+    report = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'numba': numba is not None,
+        'machine': platform.machine(),
+        'k_factor': K_FACTOR,
+        'bootstrap_rounds': bootstrap_rounds,
+        'scenarios': scenarios,
+    }
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=1)
+    print(f"✅ {len(scenarios)} scenarios written to '{out_path}'.")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the rating engines of elo_score.py on synthetic vote logs.")
+    parser.add_argument('--models', type=int, nargs='+', default=[10, 50], help='Model counts.')
+    parser.add_argument('--votes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000], help='Vote counts.')
+    parser.add_argument('--tie-rate', type=float, nargs='+', default=[0.1])
+    parser.add_argument('--both-bad-rate', type=float, nargs='+', default=[0.05])
+    parser.add_argument('--skew', type=float, nargs='+', default=[0.0, 1.0], help='Pair-sampling skew; 0 is uniform.')
+    parser.add_argument('--modes', nargs='+', default=MODES, choices=MODES)
+    parser.add_argument('--bootstrap-rounds', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', type=str, default=RESULTS_FILE, help='Machine-readable results (JSON).')
+    args = parser.parse_args()
+
+    run_benchmark(args.models, args.votes, args.tie_rate, args.both_bad_rate, args.skew, args.modes,
+                  args.bootstrap_rounds, args.seed, args.out)
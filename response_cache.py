@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+# --- Configuration ---
+LOW_WATER = 0.9  # eviction trims to this fraction of max_bytes, so a full cache is not rescanned on every put
+
+
+def image_hash(base64_image):
+    if not base64_image: return ""
+    return hashlib.sha256(base64_image.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Content-addressed, size-bounded on-disk cache of model responses.
+
+    Entries live in `root/<2-char prefix>/<sha256>.json`. The key covers everything
+    that determines a request (model, system prompt, user prompt, image, max_tokens)
+    plus a sample slot, so non-deterministic models can keep several answers for
+    the same request. A hit refreshes the file's mtime, so recency is kept on
+    disk. Several processes may share a directory: eviction rescans it and
+    removes the least recently used files until the whole directory is within
+    `low_water` * `max_bytes`. It runs whenever this process's estimate exceeds
+    `max_bytes`, and at least every `scan_interval` seconds of writes to catch
+    other writers.
+    """
+
+    def __init__(self, root='.response_cache', max_bytes=512 * 1024 * 1024, scan_interval=60, low_water=LOW_WATER):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self.scan_interval = scan_interval
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._evict()
+
+    @staticmethod
+    def make_key(model, system_prompt, prompt, base64_image=None, max_tokens=32768, sample=0):
+        payload = json.dumps([model, system_prompt, prompt, image_hash(base64_image), max_tokens, sample or 0])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + '.json')
+
+    def _scan(self):
+        """(mtime, path, size) of every entry on disk, least recently used first."""
+        found = []
+        for sub in os.listdir(self.root):
+            sub_dir = os.path.join(self.root, sub)
+            if not os.path.isdir(sub_dir): continue
+            for name in os.listdir(sub_dir):
+                if not name.endswith('.json'): continue
+                path = os.path.join(sub_dir, name)
+                try:
+                    st = os.stat(path)
+                except OSError:  # removed by another process meanwhile
+                    continue
+                found.append((st.st_mtime, path, st.st_size))
+        return sorted(found)
+
+    def _evict(self):
+        found = self._scan()
+        total = sum(size for _, _, size in found)
+        if total <= self.max_bytes:
+            target = total  # only rescanned for other writers; nothing to trim
+        else:
+            target = self.max_bytes * self.low_water
+        # the newest entry always stays, even if it alone exceeds the limit
+        for _, path, size in found[:-1]:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+        self._total = total
+        self._last_scan = time.monotonic()
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = json.load(f)['content']
+        except (OSError, ValueError, KeyError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return content
+
+    def put(self, key, content, **metadata):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(dict(metadata, content=content), ensure_ascii=False).encode('utf-8')
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)  # readers never see a partial entry
+        with self._lock:
+            self._total += len(data)
+            if self._total > self.max_bytes or time.monotonic() - self._last_scan >= self.scan_interval:
+                self._evict()
+
+    def __len__(self):
+        return len(self._scan())
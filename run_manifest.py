@@ -0,0 +1,77 @@
+import hashlib
+import json
+import os
+import time
+
+
+def prompt_hash(system_prompt, prompt, base64_image=None):
+    h = hashlib.sha256()
+    for part in (system_prompt, prompt, base64_image or ""):
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def file_sha256(file_path):
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class RunManifest:
+    """Append-only JSONL log of generated (model, prompt hash, sample) cells.
+
+    Each line records one attempt. On start-up the last record per key wins, so a
+    crashed or interrupted run can be restarted and only the missing or failed
+    cells are requested again.
+    """
+
+    def __init__(self, path='generation_manifest.jsonl'):
+        self.path = path
+        self.records = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line from a crash
+                    self.records[self.key(record['model'], record['prompt_hash'], record['sample'])] = record
+
+    @staticmethod
+    def key(model, prompt_hash, sample=0):
+        return (model, prompt_hash, sample or 0)
+
+    def is_done(self, model, prompt_hash, sample=0):
+        """True if the cell succeeded and its file is still on disk, unchanged."""
+        record = self.records.get(self.key(model, prompt_hash, sample))
+        if record is None or record['status'] != 'ok':
+            return False
+        file_path = record['path']
+        return os.path.exists(file_path) and file_sha256(file_path) == record['sha256']
+
+    def record(self, model, prompt_hash, sample, file_path, ok, error=None):
+        record = {
+            'model': model,
+            'prompt_hash': prompt_hash,
+            'sample': sample or 0,
+            'path': file_path,
+            'status': 'ok' if ok else 'failed',
+            'sha256': file_sha256(file_path) if ok else None,
+            'error': error,
+            'time': time.time(),
+        }
+        self.records[self.key(model, prompt_hash, sample)] = record
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+        return record
+
+    def summary(self):
+        ok = sum(1 for r in self.records.values() if r['status'] == 'ok')
+        return ok, len(self.records) - ok
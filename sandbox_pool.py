@@ -0,0 +1,200 @@
+import json
+import os
+import queue
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import traceback
+
+try:
+    import resource
+except ImportError:  # not available on Windows; scripts then run without rlimits
+    resource = None
+
+# imported by every worker before it is handed a script
+DEFAULT_PRELOAD = ('numpy', 'matplotlib', 'matplotlib.pyplot', 'matplotlib.animation', 'pygame')
+
+
+class SandboxPool:
+    """Pool of pre-started Python workers that each run exactly one script.
+
+    A worker imports the heavy modules (numpy, matplotlib, pygame) while it is
+    idle, then waits for a job on stdin. The job runs in its own temporary
+    directory, with its stdout/stderr captured to files and CPU, memory and
+    file-size rlimits applied. After the job the worker exits and a fresh one
+    is started in its place, so no state leaks from one script to the next.
+    """
+
+    def __init__(self, size=2, timeout=60, memory_limit=4 * 1024 ** 3, file_size_limit=256 * 1024 ** 2, preload=DEFAULT_PRELOAD):
+        self.size = size
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.file_size_limit = file_size_limit
+        self.preload = list(preload)
+        self._idle = queue.Queue()
+        self._closed = False
+        for _ in range(size):
+            self._idle.put(self._spawn())
+
+    def _spawn(self):
+        env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1')
+        return subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), json.dumps(self.preload)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env=env,
+            text=True,
+        )
+
+    def _replace(self):
+        if not self._closed:
+            self._idle.put(self._spawn())
+
+    def _checkout(self):
+        while True:
+            worker = self._idle.get()
+            if worker.poll() is None:
+                return worker
+            # died while idle (e.g. killed by the OS); start another one
+            self._idle.put(self._spawn())
+
+    def run(self, code, extra_env=None, capture=None):
+        """Runs `code` in a warm worker; returns dict(stdout, stderr, returncode, timed_out, frames).
+
+        With `capture` (dict of frames, fps, seed and a `video` and/or `trace`
+        path) the script runs headless under headless_render.FrameCapture and
+        stops once enough frames are captured. Frames are piped into an encoder
+        writing `video` while the script runs; `trace` receives the point-light
+        trajectory as .npz (points, coords, limits), without grabbing pixels if no video
+        is requested. `frames` is the number of frames captured, 0 if the script
+        exited without animating anything, and None without `capture`.
+        """
+        work_dir = tempfile.mkdtemp(prefix="sandbox_")
+        script_path = os.path.join(work_dir, "script.py")
+        stdout_path = os.path.join(work_dir, ".stdout")
+        stderr_path = os.path.join(work_dir, ".stderr")
+        frames_path = os.path.join(work_dir, ".frames")
+        with open(script_path, "w", encoding="utf-8") as f:
+            f.write(code)
+
+        job = {
+            'script': script_path,
+            'cwd': work_dir,
+            'stdout': stdout_path,
+            'stderr': stderr_path,
+            'frames': frames_path,
+            'cpu_seconds': int(self.timeout) + 1,
+            'memory_limit': self.memory_limit,
+            'file_size_limit': self.file_size_limit,
+            'env': extra_env or {},
+            'capture': capture,
+        }
+        worker = self._checkout()
+        # the next worker starts warming up while this one runs
+        threading.Thread(target=self._replace, daemon=True).start()
+        timed_out = False
+        try:
+            worker.stdin.write(json.dumps(job) + "\n")
+            worker.stdin.close()
+            returncode = worker.wait(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            worker.kill()
+            returncode = worker.wait()
+        try:
+            return {
+                'stdout': _read(stdout_path),
+                'stderr': _read(stderr_path),
+                'returncode': returncode,
+                'timed_out': timed_out,
+                'frames': int(_read(frames_path) or 0) if capture else None,
+            }
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.kill()
+            worker.wait()
+
+
+def _read(path):
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+def _worker_main(preload):
+    for module in preload:
+        try:
+            __import__(module)
+        except Exception:
+            pass
+
+    line = sys.stdin.readline()
+    if not line:
+        return 0
+    job = json.loads(line)
+
+    if resource is not None:
+        resource.setrlimit(resource.RLIMIT_CPU, (job['cpu_seconds'], job['cpu_seconds']))
+        resource.setrlimit(resource.RLIMIT_AS, (job['memory_limit'], job['memory_limit']))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (job['file_size_limit'], job['file_size_limit']))
+    os.environ.update(job['env'])
+    os.chdir(job['cwd'])
+
+    # fd-level redirection also captures output of C extensions and child processes
+    stdout_fd = os.open(job['stdout'], os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+    stderr_fd = os.open(job['stderr'], os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+    os.dup2(stdout_fd, 1)
+    os.dup2(stderr_fd, 2)
+    sys.stdout = open(1, "w", encoding="utf-8", closefd=False)
+    sys.stderr = open(2, "w", encoding="utf-8", closefd=False)
+    sys.argv = [job['script']]
+    capture = job.get('capture')
+    if capture:
+        # imported from this directory before sys.path[0] points at the job
+        import numpy as np
+        from headless_render import FFmpegSink, FrameCapture, NullSink, PointTracer
+    sys.path[0] = job['cwd']  # as if the script had been started directly
+
+    returncode = 0
+    try:
+        if capture:
+            fps = capture.get('fps', 30)
+            sink = FFmpegSink(capture['video'], fps) if capture.get('video') else NullSink()
+            tracer = PointTracer() if capture.get('trace') else None
+            frames = FrameCapture(sink, capture.get('frames', 150), fps, capture.get('seed', 0), tracer).run(job['script'])
+            with open(job['frames'], "w", encoding="utf-8") as f:
+                f.write(str(frames))
+            if frames and tracer is not None:
+                np.savez(capture['trace'], points=tracer.array(), coords=tracer.coords, limits=tracer.limits_array())
+        else:
+            runpy.run_path(job['script'], run_name='__main__')
+    except SystemExit as e:
+        if isinstance(e.code, int):
+            returncode = e.code
+        elif e.code is not None:
+            print(e.code, file=sys.stderr)
+            returncode = 1
+    except BaseException:
+        traceback.print_exc()
+        returncode = 1
+    sys.stdout.flush()
+    sys.stderr.flush()
+    return returncode
+
+
+if __name__ == "__main__":
+    os._exit(_worker_main(json.loads(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PRELOAD))
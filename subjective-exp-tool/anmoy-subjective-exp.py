@@ -11,6 +11,9 @@ from PyQt6.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout,
 from PyQt6.QtCore import QThread, pyqtSignal, Qt
 from PyQt6.QtGui import QFont
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from matchmaking import Matchmaker
+
 # --- Configuration ---
 MODELS_BASE_DIR = 'xxxxxxxx'
 VOTES_FILE = 'pairwise_result.csv'
@@ -44,6 +47,7 @@ class VotingApp(QWidget):
         super().__init__()
         self.worker = None
         self.evaluation_pool = []
+        self.matchmaker = None
         self.current_comparison_data = {}
         self.total_comparisons = 0
         self.initUI()
@@ -136,7 +140,12 @@ class VotingApp(QWidget):
         except Exception as e: self.status_label.setText(f"Error during setup: {e}"); return
         if not self.evaluation_pool: self.status_label.setText("No common script tasks found."); self.set_initial_state(); return
         
-        random.shuffle(self.evaluation_pool)
+        # past votes seed the matchmaker, which then serves the most informative pairs first
+        self.matchmaker = Matchmaker(all_models)
+        if os.path.isfile(VOTES_FILE):
+            with open(VOTES_FILE, 'r', newline='', encoding='utf-8') as csvfile:
+                self.matchmaker.replay((row['model_left'], row['model_right'], row['winner'], self.get_action_type(row['script_left']))
+                                       for row in csv.DictReader(csvfile))
         self.total_comparisons = len(self.evaluation_pool)
         self.status_label.setText(f"Session started! {self.total_comparisons} unique comparisons loaded. Click 'Next'.")
         self.next_button.setEnabled(True); self.run_pair_button.setEnabled(False); self.start_button.setEnabled(False)
@@ -146,7 +155,9 @@ class VotingApp(QWidget):
         if not self.evaluation_pool:
             self.status_label.setText(f"All {self.total_comparisons} comparisons complete! Thank you."); self.set_initial_state(); return
         
-        (model1, model2), (script1, script2) = self.evaluation_pool.pop()
+        item = self.matchmaker.choose(self.evaluation_pool, pair_of=lambda item: item[0], action_of=lambda item: self.get_action_type(item[1][0]))
+        self.evaluation_pool.remove(item)
+        (model1, model2), (script1, script2) = item
         
         if random.random() < 0.5:
             self.current_comparison_data = {'left_model': model1, 'left_script': script1, 'right_model': model2, 'right_script': script2}
@@ -211,6 +222,7 @@ class VotingApp(QWidget):
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
             if not file_exists: writer.writeheader()
             writer.writerow(data_to_log)
+        self.matchmaker.record(data_to_log['model_left'], data_to_log['model_right'], winner, self.get_action_type(data_to_log['script_left']))
         self.current_comparison_data = {}
 
 if __name__ == '__main__':
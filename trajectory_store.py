@@ -0,0 +1,211 @@
+import argparse
+import csv
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+from tqdm import tqdm
+
+from headless_render import trace_script
+from prerender_corpus import CORPUS_DIRS, find_scripts, script_hash
+from prompt_grid import parse_script_name
+
+# --- Configuration ---
+TRAJECTORY_DIR = 'trajectories'
+INDEX_FILE = 'index.csv'
+FAILED_FILE = 'failed.json'
+SHARD_ROWS = 4 * 1024 * 1024  # rows of (x, y) per shard, 32 MiB of float32
+
+INDEX_FIELDS = ['script', 'hash', 'model', 'variant', 'action', 'gender', 'weight', 'happiness',
+                'point', 'sample', 'coords', 'x_min', 'x_max', 'y_min', 'y_max', 'shard', 'offset', 'frames', 'points']
+# copied from the traced entry to the index rows of identical scripts
+SHARED_FIELDS = ['coords', 'x_min', 'x_max', 'y_min', 'y_max', 'shard', 'offset', 'frames', 'points']
+
+
+class TrajectoryStore:
+    """Point-light trajectories of the corpus, stored as memory-mapped .npy shards.
+
+    Every shard is a float32 array of shape (rows, 2). A trajectory of F frames
+    with P points occupies F * P consecutive rows of one shard; `index.csv` holds
+    its shard, row offset and shape next to the attributes parsed from the script
+    name and the limits of the space its points live in (`coords` says which:
+    matplotlib data coordinates or pygame pixels), so a subset can be selected
+    without touching the shards. Identical scripts have one row each, all
+    pointing at the same shard rows. Shards are written once and never modified.
+    """
+
+    def __init__(self, root=TRAJECTORY_DIR):
+        self.root = root
+        self.entries = []
+        self._shards = {}
+        path = os.path.join(root, INDEX_FILE)
+        if os.path.exists(path):
+            with open(path, 'r', newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    for field in ('shard', 'offset', 'frames', 'points'):
+                        row[field] = int(row[field])
+                    self.entries.append(row)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def hashes(self):
+        return {entry['hash'] for entry in self.entries}
+
+    def select(self, **filters):
+        """Index entries whose attributes match, e.g. select(model='o1', action='walking')."""
+        return [entry for entry in self.entries
+                if all(entry.get(field) == str(value) for field, value in filters.items())]
+
+    def _shard(self, number):
+        if number not in self._shards:
+            self._shards[number] = np.load(os.path.join(self.root, f"shard_{number:05d}.npy"), mmap_mode='r')
+        return self._shards[number]
+
+    def load(self, entry):
+        """(frames, points, 2) view into the memory-mapped shard of an index entry."""
+        rows = entry['frames'] * entry['points']
+        data = self._shard(entry['shard'])[entry['offset']:entry['offset'] + rows]
+        return data.reshape(entry['frames'], entry['points'], 2)
+
+    def append(self, items, shard_rows=SHARD_ROWS):
+        """Writes (entry, trajectory) pairs to new shards and extends the index."""
+        shard = max((entry['shard'] for entry in self.entries), default=-1) + 1
+        pending, pending_rows = [], 0
+
+        def flush():
+            nonlocal shard, pending, pending_rows
+            if not pending:
+                return
+            data = np.concatenate([trajectory.reshape(-1, 2) for _, trajectory in pending]).astype(np.float32)
+            path = os.path.join(self.root, f"shard_{shard:05d}.npy")
+            np.save(path + '.part.npy', data)
+            os.replace(path + '.part.npy', path)
+            offset = 0
+            for entry, trajectory in pending:
+                entry.update(shard=shard, offset=offset, frames=trajectory.shape[0], points=trajectory.shape[1])
+                offset += trajectory.shape[0] * trajectory.shape[1]
+                self.entries.append(entry)
+            shard += 1
+            pending, pending_rows = [], 0
+
+        for entry, trajectory in items:
+            pending.append((entry, trajectory))
+            pending_rows += trajectory.shape[0] * trajectory.shape[1]
+            if pending_rows >= shard_rows:
+                flush()
+        flush()
+        self.save_index()
+
+    def save_index(self):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, INDEX_FILE)
+        with open(path + '.tmp', 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=INDEX_FIELDS)
+            writer.writeheader()
+            for entry in self.entries:
+                writer.writerow({field: entry.get(field) for field in INDEX_FIELDS})
+        os.replace(path + '.tmp', path)
+
+
+def script_entry(script_path, digest):
+    """Index attributes of a corpus script; the model is its Examples/<group>/<model> directory."""
+    info = parse_script_name(script_path)
+    parts = os.path.normpath(script_path).split(os.sep)
+    if len(parts) >= 3:
+        info['model'] = parts[-3]
+    info.update(script=script_path, hash=digest)
+    return info
+
+
+def _trace_one(script_path, n_frames, fps, timeout):
+    try:
+        trajectory, coords, limits = trace_script(script_path, n_frames=n_frames, fps=fps, timeout=timeout)
+    except Exception as e:
+        message = str(e).strip().splitlines()[-1] if str(e).strip() else type(e).__name__
+        return None, None, None, message[:500]
+    if trajectory.shape[1] == 0:
+        return None, None, None, "No point-lights were drawn."
+    return trajectory, coords, limits, None
+
+
+def build_store(corpus_dirs=CORPUS_DIRS, root=TRAJECTORY_DIR, n_frames=120, fps=30, timeout=120, workers=None, retry_failed=False):
+    """Traces every corpus script whose content hash is not in the store yet.
+
+    Identical copies of a script are traced once; every copy gets its own index
+    row pointing at the same shard rows.
+    """
+    os.makedirs(root, exist_ok=True)
+    store = TrajectoryStore(root)
+    indexed = {entry['script'] for entry in store.entries}
+    failed_path = os.path.join(root, FAILED_FILE)
+    failed = {}
+    if os.path.exists(failed_path) and not retry_failed:
+        with open(failed_path, 'r', encoding='utf-8') as f:
+            failed = json.load(f)
+    failed_hashes = {entry['hash'] for entry in failed.values()}
+
+    pending = {}  # digest -> script paths without an index row
+    for script_path in find_scripts(corpus_dirs):
+        digest = script_hash(script_path)
+        if script_path not in indexed and digest not in failed_hashes:
+            pending.setdefault(digest, []).append(script_path)
+    stored = {}
+    for entry in store.entries:
+        stored.setdefault(entry['hash'], entry)
+    jobs = [(paths[0], digest) for digest, paths in pending.items() if digest not in stored]
+
+    print(f"{len(jobs)} scripts to trace, {len(store)} already in '{root}'.")
+    traced = []
+    workers = workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_trace_one, script_path, n_frames, fps, timeout): (script_path, digest)
+                   for script_path, digest in jobs}
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            script_path, digest = futures[future]
+            trajectory, coords, limits, error = future.result()
+            if error is not None:
+                for copy_path in pending[digest]:
+                    failed[copy_path] = {'hash': digest, 'error': error}
+                continue
+            entry = script_entry(script_path, digest)
+            entry['coords'] = coords
+            if limits is not None:
+                entry['x_min'], entry['x_max'], entry['y_min'], entry['y_max'] = limits
+            traced.append((entry, trajectory))
+
+    # shard layout follows the corpus order, not the completion order
+    traced.sort(key=lambda item: item[0]['script'])
+    store.append(traced)
+    for entry, _ in traced:
+        stored[entry['hash']] = entry
+    copies = []
+    for digest, paths in pending.items():
+        source = stored.get(digest)
+        for script_path in paths:
+            if source is not None and script_path != source['script']:
+                entry = script_entry(script_path, digest)
+                entry.update({field: source.get(field) for field in SHARED_FIELDS})
+                copies.append(entry)
+    if copies:
+        store.entries.extend(sorted(copies, key=lambda entry: entry['script']))
+        store.save_index()
+    with open(failed_path, 'w', encoding='utf-8') as f:
+        json.dump(failed, f, indent=1, sort_keys=True)
+    print(f"✅ {len(store)} trajectories in '{root}' ({len(copies)} new copies share rows), {len(failed)} scripts failed.")
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract point-light trajectories from the Examples corpus.")
+    parser.add_argument('--corpus', nargs='+', default=CORPUS_DIRS, help='Directories searched for scripts.')
+    parser.add_argument('--out', type=str, default=TRAJECTORY_DIR)
+    parser.add_argument('--frames', type=int, default=120, help='Frames traced per script.')
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--timeout', type=int, default=120, help='Seconds before a script is given up on.')
+    parser.add_argument('--workers', type=int, default=None, help='Parallel traces; defaults to the number of CPU cores.')
+    parser.add_argument('--retry-failed', action='store_true', help='Trace scripts that failed in a previous run again.')
+    args = parser.parse_args()
+
+    build_store(args.corpus, args.out, args.frames, args.fps, args.timeout, args.workers, args.retry_failed)
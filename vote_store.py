@@ -0,0 +1,181 @@
+import argparse
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:  # only needed to write/read the columnar store, not to normalize CSVs
+    pa = None
+
+# --- Configuration ---
+VOTE_STORE_FILE = 'votes.parquet'
+
+# the three vote log layouts in use
+#   preferences.csv   (biomotion_gradio.py): battle_id, model_a, model_b, preference
+#   pairwise_result.csv (anmoy-subjective-exp.py): model_left, model_right, script_left, script_right, winner
+#   votes.csv         (elo_score.py): model_left, model_right, winner
+# preferences.db (preference_store.py) holds the preferences.csv columns.
+PREFERENCE_WINNERS = {
+    "Left is Better": 'left',
+    "Right is Better": 'right',
+    "It's a Tie": 'tie',
+    "Both are Bad": 'both_bad',
+}
+WINNERS = ['left', 'right', 'tie', 'both_bad']
+COLUMNS = ['source', 'battle_id', 'model_left', 'model_right', 'script_left', 'script_right', 'winner']
+
+
+def read_vote_log(csv_path):
+    """Reads any of the three CSV layouts, or a preference_store.py database, into the common column set."""
+    if csv_path.endswith('.db'):
+        with sqlite3.connect(csv_path) as conn:
+            df = pd.read_sql_query("SELECT battle_id, model_a, model_b, preference FROM preferences ORDER BY battle_id", conn)
+        return normalize_votes(df, csv_path)
+    return normalize_votes(pd.read_csv(csv_path), csv_path)
+
+
+def iter_preference_batches(db_path, batch_rows=1024 * 1024):
+    """Reads a preference_store.py database `batch_rows` votes at a time, in battle order, normalized."""
+    with sqlite3.connect(db_path) as conn:
+        for df in pd.read_sql_query("SELECT battle_id, model_a, model_b, preference FROM preferences ORDER BY battle_id",
+                                    conn, chunksize=batch_rows):
+            yield normalize_votes(df, db_path)
+
+
+def normalize_votes(df, name='votes'):
+    """Maps a frame in any of the three CSV layouts onto the common column set.
+
+    Gradio's model A is shown on the left, so it becomes `model_left`. Logs
+    without battle ids are numbered by row; scripts are None where unknown.
+    """
+    if 'preference' in df.columns:
+        out = pd.DataFrame({
+            'source': 'gradio',
+            'battle_id': df['battle_id'],
+            'model_left': df['model_a'],
+            'model_right': df['model_b'],
+            'winner': df['preference'].map(PREFERENCE_WINNERS),
+        })
+    else:
+        out = pd.DataFrame({
+            'source': 'pyqt' if 'script_left' in df.columns else 'votes',
+            'battle_id': np.arange(1, len(df) + 1),
+            'model_left': df['model_left'],
+            'model_right': df['model_right'],
+            'winner': df['winner'],
+        })
+        if 'script_left' in df.columns:
+            out['script_left'] = df['script_left']
+            out['script_right'] = df['script_right']
+    unknown = out['winner'].isna() | ~out['winner'].isin(WINNERS)
+    if unknown.any():
+        print(f"❌ Skipping {int(unknown.sum())} votes with an unknown outcome in '{name}'.")
+        out = out[~unknown]
+    return out.reindex(columns=COLUMNS)
+
+
+def _dictionary(values, categories):
+    codes = pd.Categorical(values, categories=categories).codes.astype(np.int32)
+    indices = pa.array(codes, mask=codes < 0)
+    return pa.DictionaryArray.from_arrays(indices, pa.array(list(categories), pa.string()))
+
+
+def build_vote_table(csv_paths):
+    """Normalizes and concatenates vote logs into one dictionary-encoded Arrow table.
+
+    `model_left` and `model_right` share one dictionary, so their indices are
+    model ids that every analysis can use directly.
+    """
+    if pa is None:
+        raise ImportError("The columnar vote store needs pyarrow: pip install pyarrow")
+    df = pd.concat([read_vote_log(path) for path in csv_paths], ignore_index=True)
+    models = pd.unique(pd.concat([df['model_left'], df['model_right']], ignore_index=True))
+    scripts = pd.unique(pd.concat([df['script_left'], df['script_right']], ignore_index=True).dropna())
+    return pa.table({
+        'source': _dictionary(df['source'], pd.unique(df['source'])),
+        'battle_id': pa.array(df['battle_id'].to_numpy(dtype=np.int64)),
+        'model_left': _dictionary(df['model_left'], models),
+        'model_right': _dictionary(df['model_right'], models),
+        'script_left': _dictionary(df['script_left'], scripts),
+        'script_right': _dictionary(df['script_right'], scripts),
+        'winner': _dictionary(df['winner'], WINNERS),
+    })
+
+
+def write_vote_store(csv_paths, out_path=VOTE_STORE_FILE):
+    """Writes the normalized table as Parquet, or as an Arrow IPC file for .arrow/.feather paths."""
+    table = build_vote_table(csv_paths)
+    tmp_path = out_path + '.tmp'
+    if out_path.endswith(('.arrow', '.feather')):
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+    else:
+        pq.write_table(table, tmp_path)
+    os.replace(tmp_path, out_path)
+    return table
+
+
+def read_vote_store(path=VOTE_STORE_FILE):
+    """The vote table; Arrow IPC files are memory-mapped, so their columns are zero-copy."""
+    if pa is None:
+        raise ImportError("The columnar vote store needs pyarrow: pip install pyarrow")
+    if path.endswith(('.arrow', '.feather')):
+        return feather.read_table(path, memory_map=True)
+    return pq.read_table(path, memory_map=True)
+
+
+def iter_vote_batches(path=VOTE_STORE_FILE, batch_size=1024 * 1024):
+    """Reads the store one record batch at a time, as DataFrames, without loading all of it."""
+    if pa is None:
+        raise ImportError("The columnar vote store needs pyarrow: pip install pyarrow")
+    if path.endswith(('.arrow', '.feather')):
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i).to_pandas()
+        return
+    for batch in pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=batch_size):
+        yield batch.to_pandas()
+
+
+def _encoded(column):
+    """(dictionary values, indices as a NumPy array) of a dictionary column."""
+    column = column.combine_chunks() if column.num_chunks != 1 else column.chunk(0)
+    return column.dictionary.to_pylist(), column.indices.to_numpy(zero_copy_only=False)
+
+
+def votes_from_table(table):
+    """(models, left ids, right ids, left scores) straight from the dictionary indices.
+
+    Tables written by build_vote_table share one model dictionary; other
+    dictionaries are remapped onto the left column's.
+    """
+    table = table.unify_dictionaries()
+    models, left = _encoded(table.column('model_left'))
+    right_models, right = _encoded(table.column('model_right'))
+    if right_models != models:
+        index = {model: i for i, model in enumerate(models)}
+        for model in right_models:
+            index.setdefault(model, len(models))
+            if len(index) > len(models):
+                models.append(model)
+        right = np.array([index[model] for model in right_models], dtype=np.int64)[right]
+    winners, outcome = _encoded(table.column('winner'))
+    # score of the left model; tie and both_bad count as a draw
+    winner_scores = np.array([{'left': 1.0, 'right': 0.0}.get(w, 0.5) for w in winners])
+    return models, left.astype(np.int32, copy=False), right.astype(np.int32, copy=False), winner_scores[outcome]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Normalize Gradio, PyQt and votes.csv logs into one columnar vote table.")
+    parser.add_argument('logs', nargs='+', help='preferences.csv, pairwise_result.csv and/or votes.csv files.')
+    parser.add_argument('--out', type=str, default=VOTE_STORE_FILE, help='.parquet, or .arrow/.feather for a memory-mappable file.')
+    args = parser.parse_args()
+
+    table = write_vote_store(args.logs, args.out)
+    n_models = len(table.column('model_left').chunk(0).dictionary) if table.num_rows else 0
+    print(f"✅ Wrote {table.num_rows} votes between {n_models} models to '{args.out}'.")